@@ -0,0 +1,68 @@
+import hashlib
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    """
+    Build a strong ETag from the values a representation depends on
+
+    Args:
+        *parts: Values identifying one version of a resource
+
+    Returns:
+        str: Quoted ETag
+    """
+    digest = hashlib.sha256(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return quote_etag(digest[:32])
+
+
+def etag_matches(request, etag):
+    """
+    Check the request's If-None-Match header against an ETag
+
+    If-None-Match uses the weak comparison, so ``W/`` prefixes are ignored.
+
+    Args:
+        request (Request): Incoming request
+        etag (str): Current ETag of the resource
+
+    Returns:
+        bool: True when the client already holds this version
+    """
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag in (tag.removeprefix('W/') for tag in etags)
+
+
+def with_etag(response, etag):
+    """
+    Attach an ETag and require clients to revalidate before reusing the body
+
+    Args:
+        response (Response): Response to decorate
+        etag (str): Current ETag of the resource
+
+    Returns:
+        Response: The same response
+    """
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def not_modified(etag):
+    """
+    Build an empty 304 response for a matching ETag
+
+    Args:
+        etag (str): Current ETag of the resource
+
+    Returns:
+        Response: 304 Not Modified
+    """
+    return with_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
@@ -0,0 +1,138 @@
+import logging
+import functools
+from contextvars import ContextVar
+import redis
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+REPLICA_DB_ALIAS = 'replica'
+
+_reading_from_replica = ContextVar('reading_from_replica', default=False)
+
+
+def replica_configured():
+    """Whether a replica alias is configured (DB_REPLICA_HOST)"""
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def _pin_key(user_id):
+    return f'replica_pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """
+    Send the user's reads to the primary until the replica has caught up
+
+    Args:
+        user_id: Primary key of the user that just wrote
+    """
+    try:
+        cache.set(_pin_key(user_id), 1, settings.DB_REPLICA_STICKINESS_SECONDS)
+    except redis.RedisError as exc:
+        logger.warning(f"Could not pin user {user_id} to the primary: {exc}")
+
+
+def is_pinned_to_primary(user):
+    """
+    Check whether the user wrote recently enough to need read-your-writes
+
+    An unreachable cache counts as pinned, so reads fall back to the primary.
+
+    Args:
+        user: Authenticated user or AnonymousUser
+
+    Returns:
+        bool: True if reads must go to the primary
+    """
+    if not user.is_authenticated:
+        return False
+    try:
+        return cache.get(_pin_key(user.pk)) is not None
+    except redis.RedisError as exc:
+        logger.warning(f"Replica pin lookup failed, reading from the primary: {exc}")
+        return True
+
+
+def use_replica(view):
+    """
+    Route the ORM reads of a read-only view to the replica
+
+    Apply it below ``@api_view`` so authentication has already run. Users
+    pinned by a recent write keep reading from the primary. Querysets that
+    are evaluated after the view returns, e.g. a streamed iterator, must be
+    bound with ``.using(queryset.db)`` inside the view.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not replica_configured() or is_pinned_to_primary(request.user):
+            return view(request, *args, **kwargs)
+
+        token = _reading_from_replica.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _reading_from_replica.reset(token)
+
+    return wrapper
+
+
+class ReplicaRouter:
+    """Send reads inside ``use_replica`` views to the replica and everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        if _reading_from_replica.get() and replica_configured():
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaStickinessMiddleware:
+    """Pin users to the primary for a short while after a successful write"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Stay async under ASGI so async views do not tie up a thread
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        response = self.get_response(request)
+        self._pin_after_write(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if replica_configured() and request.method not in SAFE_METHODS:
+            await sync_to_async(self._pin_after_write)(request, response)
+        return response
+
+    def _pin_after_write(self, request, response):
+        user = getattr(request, 'user', None)
+        if (
+            replica_configured()
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and user is not None
+            and user.is_authenticated
+        ):
+            pin_to_primary(user.pk)
@@ -0,0 +1,100 @@
+"""
+Read-only serializers that build output dicts straight from ``.values()`` rows
+
+They skip model instantiation and DRF's field-by-field ``to_representation``
+and produce the same JSON as the matching ``ModelSerializer``. The field plan
+is resolved once per class, so serializing a row is a single pass over
+precomputed (name, getter, converter) entries.
+"""
+from decimal import Decimal
+from operator import itemgetter
+from django.utils import timezone
+
+
+def as_string(value):
+    """Represent UUIDs and other scalars as strings"""
+    return str(value)
+
+
+def as_decimal(decimal_places):
+    """Build a converter matching DRF's DecimalField string output"""
+    exponent = Decimal(1).scaleb(-decimal_places)
+
+    def convert(value):
+        return '{:f}'.format(value.quantize(exponent))
+    return convert
+
+
+def as_datetime(value):
+    """Represent datetimes like DRF's ISO 8601 DateTimeField output"""
+    value = value.astimezone(timezone.get_current_timezone()).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class ValuesSerializer:
+    """
+    Base class for fast read-only serializers
+
+    Subclasses declare ``fields`` as (output name, source, converter)
+    triples. ``source`` is a ``.values()`` lookup or a callable receiving the
+    whole row; ``converter`` is applied to non-null values. Lookups used only
+    by callables are listed in ``extra_lookups``.
+    """
+
+    fields = ()
+    extra_lookups = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        lookups = [source for _, source, _ in cls.fields if isinstance(source, str)]
+        cls._lookups = tuple(dict.fromkeys(lookups + list(cls.extra_lookups)))
+        cls._plan = tuple(
+            (name, itemgetter(source) if isinstance(source, str) else source, converter)
+            for name, source, converter in cls.fields
+        )
+
+    @classmethod
+    def values(cls, queryset):
+        """
+        Restrict a queryset to the columns this serializer needs
+
+        Args:
+            queryset (QuerySet): Queryset to read from
+
+        Returns:
+            QuerySet: ``.values()`` queryset yielding row dicts
+        """
+        return queryset.values(*cls._lookups)
+
+    @classmethod
+    def to_representation(cls, row):
+        """
+        Serialize one ``.values()`` row
+
+        Args:
+            row (dict): Row produced by ``values()``
+
+        Returns:
+            dict: Representation matching the ModelSerializer output
+        """
+        data = {}
+        for name, get, convert in cls._plan:
+            value = get(row)
+            data[name] = convert(value) if convert is not None and value is not None else value
+        return data
+
+    @classmethod
+    def serialize(cls, rows):
+        """
+        Serialize an iterable of ``.values()`` rows
+
+        Args:
+            rows (iterable): Rows produced by ``values()``
+
+        Returns:
+            list: Representations in row order
+        """
+        to_representation = cls.to_representation
+        return [to_representation(row) for row in rows]
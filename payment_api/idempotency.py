@@ -0,0 +1,145 @@
+import json
+import time
+import hashlib
+import logging
+import functools
+import redis
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from rest_framework import status
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Responses that depend on the credentials rather than on the request are not stored
+UNSTORED_STATUS_CODES = {status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN}
+
+
+def _error_response(message, status_code):
+    """Build a standardized error response outside of DRF"""
+    return JsonResponse(
+        {'success': False, 'data': None, 'error': message},
+        status=status_code
+    )
+
+
+def _replay(stored, fingerprint):
+    """
+    Build the response for a request whose key has already been used
+
+    Args:
+        stored (bytes): Stored response record
+        fingerprint (str): Hash of the current request body
+
+    Returns:
+        HttpResponse: The original response, or 422 if the body differs
+    """
+    record = json.loads(stored)
+    if record['fingerprint'] != fingerprint:
+        return _error_response(
+            'Idempotency-Key was already used with a different request body',
+            status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+
+    response = HttpResponse(
+        record['body'],
+        status=record['status'],
+        content_type=record['content_type']
+    )
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _wait_for_response(client, cache_key):
+    """
+    Wait for a concurrent request with the same key to store its response
+
+    Returns:
+        bytes: Stored response record, or None if it did not appear in time
+    """
+    deadline = time.monotonic() + settings.IDEMPOTENCY_LOCK_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        stored = client.get(cache_key)
+        if stored is not None:
+            return stored
+    return None
+
+
+def idempotent(view):
+    """
+    Make a POST view safe to retry with an ``Idempotency-Key`` header
+
+    The first response for a key is stored in Redis for
+    IDEMPOTENCY_KEY_TTL_SECONDS and replayed for later requests without
+    running the view, so replays never reach the database. Keys are scoped
+    by the Authorization header and the path, which lets a replay be served
+    before authentication. A concurrent duplicate waits briefly on a lock
+    and is rejected with 409 if the first request has not finished. When
+    Redis is unavailable the view runs without idempotency.
+
+    Must be applied outside ``@api_view``.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        credentials = request.headers.get('Authorization')
+        if not key or not credentials:
+            return view(request, *args, **kwargs)
+
+        if len(key) > 255:
+            return _error_response(
+                'Idempotency-Key must be at most 255 characters',
+                status.HTTP_400_BAD_REQUEST
+            )
+
+        scope = hashlib.sha256(f'{credentials}|{request.path}|{key}'.encode()).hexdigest()
+        cache_key = f'idempotency:{scope}'
+        lock_key = f'{cache_key}:lock'
+        fingerprint = hashlib.sha256(request.body).hexdigest()
+
+        try:
+            client = get_redis()
+            stored = client.get(cache_key)
+            if stored is None:
+                locked = client.set(
+                    lock_key, 1, nx=True, px=int(settings.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS * 1000)
+                )
+                if not locked:
+                    stored = _wait_for_response(client, cache_key)
+                    if stored is None:
+                        return _error_response(
+                            'A request with this Idempotency-Key is already in progress',
+                            status.HTTP_409_CONFLICT
+                        )
+        except redis.RedisError as exc:
+            logger.warning(f"Idempotency store unavailable: {str(exc)}")
+            return view(request, *args, **kwargs)
+
+        if stored is not None:
+            return _replay(stored, fingerprint)
+
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+
+            if response.status_code < 500 and response.status_code not in UNSTORED_STATUS_CODES:
+                record = {
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'content_type': response['Content-Type'],
+                    'body': response.content.decode(),
+                }
+                try:
+                    client.set(cache_key, json.dumps(record), ex=settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+                except redis.RedisError as exc:
+                    logger.warning(f"Could not store idempotent response: {str(exc)}")
+            return response
+        finally:
+            try:
+                client.delete(lock_key)
+            except redis.RedisError as exc:
+                logger.warning(f"Could not release idempotency lock: {str(exc)}")
+
+    return wrapper
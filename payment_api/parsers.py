@@ -0,0 +1,21 @@
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class ORJSONParser(BaseParser):
+    """Drop-in replacement for JSONParser that decodes bytes with orjson"""
+
+    media_type = 'application/json'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """
+        Parse the incoming JSON request body
+
+        Returns:
+            object: Decoded request data
+        """
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {str(exc)}')
@@ -0,0 +1,246 @@
+import re
+import logging
+from datetime import datetime, timezone as dt_timezone
+from django.db import connection, transaction as db_transaction
+
+logger = logging.getLogger(__name__)
+
+PARTITION_KEY = 'created_at'
+
+# Unpartitioned tables whose rows point at a partitioned table's rows; they
+# are archived together with the partition holding their parent rows
+DEPENDENT_TABLES = {
+    'transactions': [('refunds', 'transaction_id')],
+}
+
+
+def month_start(value):
+    """Truncate a datetime to the first instant of its month in UTC"""
+    value = value.astimezone(dt_timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value, months):
+    """Shift a month start by a number of months"""
+    years, month = divmod(value.month - 1 + months, 12)
+    return value.replace(year=value.year + years, month=month + 1)
+
+
+def partition_name(table, month):
+    """Name of the partition holding ``month``, e.g. ``transactions_p2026_10``"""
+    return f'{table}_p{month.year:04d}_{month.month:02d}'
+
+
+def _parse_partition_month(table, name):
+    """Month of a partition created by ``create_partition``, or None for other partitions"""
+    match = re.fullmatch(rf'{re.escape(table)}_p(\d{{4}})_(\d{{2}})', name)
+    if match is None:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=dt_timezone.utc)
+
+
+def create_partition(cursor, table, month):
+    """
+    Create the monthly partition of ``table`` starting at ``month``
+
+    Args:
+        cursor: Database cursor
+        table (str): Partitioned table
+        month (datetime): First instant of the month
+    """
+    quote = connection.ops.quote_name
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS {quote(partition_name(table, month))} '
+        f'PARTITION OF {quote(table)} FOR VALUES FROM (%s) TO (%s)',
+        [month, add_months(month, 1)]
+    )
+
+
+def convert_to_partitioned(schema_editor, table, months_ahead):
+    """
+    Rebuild ``table`` as a table range-partitioned by month on ``created_at``
+
+    Postgres requires every primary key and unique constraint of a
+    partitioned table to include the partition key, so both are widened with
+    ``created_at``, and foreign keys from other tables to this one are dropped.
+    Indexes and outgoing foreign keys are recreated under their original
+    names. Existing rows are copied into monthly partitions; a default
+    partition catches rows outside the pre-created range.
+
+    Args:
+        schema_editor: Migration schema editor
+        table (str): Table to convert
+        months_ahead (int): Future monthly partitions to create
+    """
+    quote = schema_editor.quote_name
+    legacy = f'{table}_unpartitioned'
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT indexname, indexdef FROM pg_indexes
+            WHERE schemaname = current_schema() AND tablename = %s
+              AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)
+            """,
+            [table, table]
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [table]
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT con.conname, array_agg(att.attname::text ORDER BY key.ordinality)
+            FROM pg_constraint con
+            CROSS JOIN LATERAL unnest(con.conkey) WITH ORDINALITY AS key(attnum, ordinality)
+            JOIN pg_attribute att ON att.attrelid = con.conrelid AND att.attnum = key.attnum
+            WHERE con.conrelid = %s::regclass AND con.contype = 'u'
+            GROUP BY con.conname
+            """,
+            [table]
+        )
+        unique_constraints = cursor.fetchall()
+        cursor.execute(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+            "WHERE confrelid = %s::regclass AND contype = 'f'",
+            [table]
+        )
+        referencing = cursor.fetchall()
+        cursor.execute(f'SELECT min({quote(PARTITION_KEY)}) FROM {quote(table)}')
+        oldest = cursor.fetchone()[0]
+
+        for referencing_table, name in referencing:
+            cursor.execute(f'ALTER TABLE {referencing_table} DROP CONSTRAINT {quote(name)}')
+
+        cursor.execute(f'ALTER TABLE {quote(table)} RENAME TO {quote(legacy)}')
+        cursor.execute(
+            f'CREATE TABLE {quote(table)} (LIKE {quote(legacy)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE ({quote(PARTITION_KEY)})'
+        )
+
+        current = month_start(datetime.now(dt_timezone.utc))
+        month = month_start(oldest) if oldest else current
+        while month <= add_months(current, months_ahead):
+            create_partition(cursor, table, month)
+            month = add_months(month, 1)
+        cursor.execute(f'CREATE TABLE {quote(f"{table}_default")} PARTITION OF {quote(table)} DEFAULT')
+
+        cursor.execute(f'INSERT INTO {quote(table)} SELECT * FROM {quote(legacy)}')
+        cursor.execute(f'DROP TABLE {quote(legacy)}')
+
+        cursor.execute(
+            f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(f"{table}_pkey")} '
+            f'PRIMARY KEY (id, {quote(PARTITION_KEY)})'
+        )
+        for name, columns in unique_constraints:
+            columns = ', '.join(quote(column) for column in [*columns, PARTITION_KEY])
+            cursor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} UNIQUE ({columns})')
+        for _, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}')
+
+
+def ensure_partitions(table, months_ahead, now=None):
+    """
+    Create the monthly partitions of ``table`` for the coming months
+
+    Args:
+        table (str): Partitioned table
+        months_ahead (int): Future monthly partitions to keep ready
+        now (datetime): Current time, for tests
+
+    Returns:
+        int: Number of partitions checked
+    """
+    current = month_start(now or datetime.now(dt_timezone.utc))
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            create_partition(cursor, table, add_months(current, offset))
+    return months_ahead + 1
+
+
+def _archive_dependents(cursor, table, partition, archive_schema):
+    """
+    Move the rows of ``DEPENDENT_TABLES`` that point into ``partition`` to the archive schema
+
+    Dependent rows land in a table of the same name in ``archive_schema``,
+    created on first use with the live table's columns.
+
+    Args:
+        cursor: Database cursor
+        table (str): Partitioned table
+        partition (str): Partition about to be archived
+        archive_schema (str): Schema receiving archived rows
+    """
+    quote = connection.ops.quote_name
+    for dependent, column in DEPENDENT_TABLES.get(table, []):
+        target = f'{quote(archive_schema)}.{quote(dependent)}'
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {target} (LIKE {quote(dependent)} INCLUDING DEFAULTS)'
+        )
+        cursor.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = %s AND table_name = %s ORDER BY ordinal_position",
+            [archive_schema, dependent]
+        )
+        columns = ', '.join(quote(name) for (name,) in cursor.fetchall())
+        cursor.execute(
+            f'WITH moved AS ('
+            f'DELETE FROM {quote(dependent)} WHERE {quote(column)} IN (SELECT id FROM {quote(partition)}) '
+            f'RETURNING *'
+            f') INSERT INTO {target} ({columns}) SELECT {columns} FROM moved'
+        )
+        if cursor.rowcount:
+            logger.info(f"Archived {cursor.rowcount} {dependent} rows of partition {partition}")
+
+
+def archive_partitions(table, retention_months, archive_schema, now=None):
+    """
+    Detach monthly partitions older than the retention and move them to an archive schema
+
+    Detaching is a metadata change, so old data leaves the hot table's
+    indexes and vacuum work without a bulk DELETE. Archived partitions stay
+    queryable as ``<archive_schema>.<partition>``. Rows of the unpartitioned
+    ``DEPENDENT_TABLES`` pointing into a partition (refunds of archived
+    transactions) move to ``<archive_schema>.<table>`` in the same
+    transaction, so no live row is left referencing an archived one.
+
+    Args:
+        table (str): Partitioned table
+        retention_months (int): Whole months to keep attached
+        archive_schema (str): Schema receiving detached partitions
+        now (datetime): Current time, for tests
+
+    Returns:
+        list: Names of the archived partitions
+    """
+    quote = connection.ops.quote_name
+    cutoff = add_months(month_start(now or datetime.now(dt_timezone.utc)), -retention_months)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = %s::regclass ORDER BY child.relname",
+            [table]
+        )
+        expired = [
+            name for (name,) in cursor.fetchall()
+            if (month := _parse_partition_month(table, name)) is not None and month < cutoff
+        ]
+        if not expired:
+            return []
+
+        cursor.execute(f'CREATE SCHEMA IF NOT EXISTS {quote(archive_schema)}')
+        for name in expired:
+            with db_transaction.atomic():
+                _archive_dependents(cursor, table, name, archive_schema)
+                cursor.execute(f'ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}')
+                cursor.execute(f'ALTER TABLE {quote(name)} SET SCHEMA {quote(archive_schema)}')
+            logger.info(f"Archived partition {name} to schema {archive_schema}")
+
+    return expired
@@ -0,0 +1,46 @@
+import redis
+import redis.asyncio
+from django.conf import settings
+
+_pool = None
+
+
+def get_redis():
+    """
+    Get a Redis client backed by the process-wide connection pool
+
+    The pool is created lazily from REDIS_HOST/PORT/DB; redis-py resets it
+    automatically in forked worker processes.
+
+    Returns:
+        redis.Redis: Redis client
+    """
+    global _pool
+    if _pool is None:
+        _pool = redis.ConnectionPool(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS
+        )
+    return redis.Redis(connection_pool=_pool)
+
+
+def get_async_redis():
+    """
+    Get an asyncio Redis client for use inside one event-loop task
+
+    asyncio connections are bound to the loop that opened them, so a new
+    client is returned on every call and must be closed with ``aclose()``.
+    No read timeout is set; blocking reads pass their own.
+
+    Returns:
+        redis.asyncio.Redis: Redis client
+    """
+    return redis.asyncio.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=settings.REDIS_DB,
+        socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS
+    )
@@ -0,0 +1,64 @@
+import datetime
+import decimal
+import orjson
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def orjson_default(obj):
+    """
+    Encode the types orjson does not handle natively, like DRF's JSONEncoder
+
+    UUIDs, datetimes, dates and dict/list/str subclasses are encoded by
+    orjson itself.
+    """
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, decimal.Decimal):
+        # Serializers coerce decimals to strings; raw Decimals match DRF's encoder
+        return float(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if hasattr(obj, '__iter__'):
+        return list(obj)
+    raise TypeError(f'Object of type {obj.__class__.__name__} is not JSON serializable')
+
+
+class ORJSONRenderer(BaseRenderer):
+    """Drop-in replacement for JSONRenderer that writes bytes with orjson"""
+
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Render ``data`` into JSON bytes
+
+        Returns:
+            bytes: Encoded response body
+        """
+        if data is None:
+            return b''
+
+        options = ORJSON_OPTIONS
+        if self._requested_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(data, default=orjson_default, option=options)
+
+    def _requested_indent(self, accepted_media_type, renderer_context):
+        """Honour the ``indent`` media type parameter and renderer context like JSONRenderer"""
+        if accepted_media_type:
+            for param in accepted_media_type.split(';')[1:]:
+                name, _, value = param.strip().partition('=')
+                if name == 'indent' and value:
+                    return True
+        return bool(renderer_context.get('indent'))
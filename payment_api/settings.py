@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # Third-party apps
     'rest_framework',
@@ -61,6 +62,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'payment_api.db_router.ReplicaStickinessMiddleware',
 ]
 
 ROOT_URLCONF = 'payment_api.urls'
@@ -97,6 +99,19 @@ DATABASES = {
     }
 }
 
+# Read replica for read-only views; unset keeps every query on the primary
+DB_REPLICA_HOST = config('DB_REPLICA_HOST', default='')
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': DB_REPLICA_HOST,
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['payment_api.db_router.ReplicaRouter']
+# How long a merchant's reads stay on the primary after a write (read-your-writes)
+DB_REPLICA_STICKINESS_SECONDS = config('DB_REPLICA_STICKINESS_SECONDS', default=5, cast=float)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -153,10 +168,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'payment_api.renderers.ORJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'payment_api.parsers.ORJSONParser',
     ],
     'EXCEPTION_HANDLER': 'payment_api.utils.custom_exception_handler',
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
@@ -187,11 +202,40 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
+CELERY_BEAT_SCHEDULE = {}
 
 # Redis Configuration
 REDIS_HOST = config('REDIS_HOST', default='localhost')
 REDIS_PORT = config('REDIS_PORT', default=6379, cast=int)
 REDIS_DB = config('REDIS_DB', default=0, cast=int)
+REDIS_SOCKET_TIMEOUT_SECONDS = config('REDIS_SOCKET_TIMEOUT_SECONDS', default=1, cast=float)
+
+# Cache Configuration
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('CACHE_URL', default=f'redis://{REDIS_HOST}:{REDIS_PORT}/1'),
+        'KEY_PREFIX': 'payment_api',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'socket_timeout': REDIS_SOCKET_TIMEOUT_SECONDS,
+            'socket_connect_timeout': REDIS_SOCKET_TIMEOUT_SECONDS,
+        },
+    }
+}
+# Lifetime of cached terminal transactions and refunds
+RESOURCE_CACHE_TTL_SECONDS = config('RESOURCE_CACHE_TTL_SECONDS', default=300, cast=int)
+
+# Transaction status events (Server-Sent Events over Redis pub/sub)
+# Longest a stream stays open before the client reconnects
+TRANSACTION_EVENTS_TIMEOUT_SECONDS = config('TRANSACTION_EVENTS_TIMEOUT_SECONDS', default=60, cast=int)
+# Idle interval between keep-alive comments on an open stream
+TRANSACTION_EVENTS_KEEPALIVE_SECONDS = config('TRANSACTION_EVENTS_KEEPALIVE_SECONDS', default=15, cast=int)
+
+# Idempotency Configuration
+IDEMPOTENCY_KEY_TTL_SECONDS = config('IDEMPOTENCY_KEY_TTL_SECONDS', default=24 * 60 * 60, cast=int)
+IDEMPOTENCY_LOCK_TIMEOUT_SECONDS = config('IDEMPOTENCY_LOCK_TIMEOUT_SECONDS', default=30, cast=float)
+IDEMPOTENCY_LOCK_WAIT_SECONDS = config('IDEMPOTENCY_LOCK_WAIT_SECONDS', default=2, cast=float)
 
 # API Configuration
 API_KEY_LENGTH = config('API_KEY_LENGTH', default=32, cast=int)
@@ -201,6 +245,74 @@ TOKEN_EXPIRY_HOURS = config('TOKEN_EXPIRY_HOURS', default=24, cast=int)
 TRANSACTION_PROCESSING_MIN_DELAY = config('TRANSACTION_PROCESSING_MIN_DELAY', default=3, cast=int)
 TRANSACTION_PROCESSING_MAX_DELAY = config('TRANSACTION_PROCESSING_MAX_DELAY', default=5, cast=int)
 TRANSACTION_SUCCESS_RATE = config('TRANSACTION_SUCCESS_RATE', default=0.8, cast=float)
+# 'deferred' schedules the completion step with a countdown, 'blocking' sleeps in the worker,
+# 'batch' leaves pending rows to the periodic batch processor and 'async' to the asyncio engine
+TRANSACTION_PROCESSING_MODE = config('TRANSACTION_PROCESSING_MODE', default='deferred')
+TRANSACTION_BATCH_SIZE = config('TRANSACTION_BATCH_SIZE', default=500, cast=int)
+TRANSACTION_BATCH_INTERVAL_SECONDS = config('TRANSACTION_BATCH_INTERVAL_SECONDS', default=1, cast=float)
+TRANSACTION_ASYNC_MAX_CONCURRENCY = config('TRANSACTION_ASYNC_MAX_CONCURRENCY', default=1000, cast=int)
+TRANSACTION_BULK_MAX_ITEMS = config('TRANSACTION_BULK_MAX_ITEMS', default=500, cast=int)
+TRANSACTION_SEARCH_MAX_RESULTS = config('TRANSACTION_SEARCH_MAX_RESULTS', default=50, cast=int)
+TRANSACTION_EXPORT_CHUNK_SIZE = config('TRANSACTION_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+TRANSACTION_STUCK_THRESHOLD_SECONDS = config('TRANSACTION_STUCK_THRESHOLD_SECONDS', default=300, cast=int)
+TRANSACTION_RECONCILE_INTERVAL_SECONDS = config('TRANSACTION_RECONCILE_INTERVAL_SECONDS', default=60, cast=int)
+TRANSACTION_RECONCILE_BATCH_SIZE = config('TRANSACTION_RECONCILE_BATCH_SIZE', default=1000, cast=int)
+# Refunds settle after the same simulated latency as transactions
+REFUND_SUCCESS_RATE = config('REFUND_SUCCESS_RATE', default=0.95, cast=float)
+REFUND_BULK_MAX_ITEMS = config('REFUND_BULK_MAX_ITEMS', default=10000, cast=int)
+
+CELERY_BEAT_SCHEDULE['reconcile-stuck-transactions'] = {
+    'task': 'payments.tasks.reconcile_stuck_transactions',
+    'schedule': TRANSACTION_RECONCILE_INTERVAL_SECONDS,
+}
+CELERY_BEAT_SCHEDULE['reconcile-stuck-refunds'] = {
+    'task': 'payments.tasks.reconcile_stuck_refunds',
+    'schedule': TRANSACTION_RECONCILE_INTERVAL_SECONDS,
+}
+
+if TRANSACTION_PROCESSING_MODE == 'batch':
+    CELERY_BEAT_SCHEDULE['process-pending-transactions'] = {
+        'task': 'payments.tasks.process_pending_batch',
+        'schedule': TRANSACTION_BATCH_INTERVAL_SECONDS,
+    }
+
+# Analytics Rollup Configuration
+ANALYTICS_ROLLUP_INTERVAL_SECONDS = config('ANALYTICS_ROLLUP_INTERVAL_SECONDS', default=300, cast=int)
+# Rows younger than the lag are left for the next run so in-flight commits are not skipped
+ANALYTICS_ROLLUP_LAG_SECONDS = config('ANALYTICS_ROLLUP_LAG_SECONDS', default=60, cast=int)
+ANALYTICS_ROLLUP_MAX_WINDOW_HOURS = config('ANALYTICS_ROLLUP_MAX_WINDOW_HOURS', default=24, cast=int)
+
+CELERY_BEAT_SCHEDULE['build-analytics-rollups'] = {
+    'task': 'payments.tasks.build_analytics_rollups',
+    'schedule': ANALYTICS_ROLLUP_INTERVAL_SECONDS,
+}
+
+# Partitioning Configuration
+# transactions and webhook_logs are range-partitioned by month on created_at
+PARTITION_MONTHS_AHEAD = config('PARTITION_MONTHS_AHEAD', default=3, cast=int)
+PARTITION_ARCHIVE_SCHEMA = config('PARTITION_ARCHIVE_SCHEMA', default='archive')
+PARTITION_MAINTENANCE_INTERVAL_SECONDS = config('PARTITION_MAINTENANCE_INTERVAL_SECONDS', default=24 * 60 * 60, cast=int)
+PARTITION_RETENTION_MONTHS = {
+    'transactions': config('TRANSACTION_RETENTION_MONTHS', default=24, cast=int),
+    'webhook_logs': config('WEBHOOK_LOG_RETENTION_MONTHS', default=3, cast=int),
+}
+
+CELERY_BEAT_SCHEDULE['maintain-partitions'] = {
+    'task': 'payments.tasks.maintain_partitions',
+    'schedule': PARTITION_MAINTENANCE_INTERVAL_SECONDS,
+}
+
+# Outbox Relay Configuration
+OUTBOX_RELAY_BATCH_SIZE = config('OUTBOX_RELAY_BATCH_SIZE', default=500, cast=int)
+OUTBOX_RELAY_INTERVAL_SECONDS = config('OUTBOX_RELAY_INTERVAL_SECONDS', default=0.5, cast=float)
+OUTBOX_RELAY_MAX_BACKOFF_SECONDS = config('OUTBOX_RELAY_MAX_BACKOFF_SECONDS', default=30, cast=float)
+
+# Payment Gateway Configuration
+PAYMENT_GATEWAY_BACKEND = config('PAYMENT_GATEWAY_BACKEND', default='payments.gateways.SimulatedGateway')
+PAYMENT_GATEWAY_URL = config('PAYMENT_GATEWAY_URL', default='http://localhost:8001')
+PAYMENT_GATEWAY_TIMEOUT_SECONDS = config('PAYMENT_GATEWAY_TIMEOUT_SECONDS', default=10, cast=float)
+PAYMENT_GATEWAY_CONNECT_TIMEOUT_SECONDS = config('PAYMENT_GATEWAY_CONNECT_TIMEOUT_SECONDS', default=3, cast=float)
+PAYMENT_GATEWAY_POOL_SIZE = config('PAYMENT_GATEWAY_POOL_SIZE', default=20, cast=int)
 
 # Webhook Configuration
 WEBHOOK_TIMEOUT_SECONDS = config('WEBHOOK_TIMEOUT_SECONDS', default=10, cast=int)
@@ -0,0 +1,125 @@
+"""
+Asyncio transaction processing engine
+
+Claims pending transactions in batches and settles them concurrently in a
+single event loop. Processor latency is awaited rather than slept, so one
+process can keep ``TRANSACTION_ASYNC_MAX_CONCURRENCY`` settlements in
+flight at the same time.
+"""
+import asyncio
+import logging
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from .models import Transaction
+from .gateways import get_gateway
+from .tasks import _apply_outcome, _save_settlement, claim_pending_transactions
+
+logger = logging.getLogger(__name__)
+
+
+async def settle_transaction(transaction_id, semaphore):
+    """
+    Await the processor and settle a claimed transaction
+
+    Args:
+        transaction_id (str): UUID of a transaction in the processing state
+        semaphore (asyncio.Semaphore): Bounds concurrent processor calls
+
+    Returns:
+        str: Final status, or None if the transaction was already settled
+    """
+    transaction = await Transaction.objects.aget(id=transaction_id)
+    if transaction.status != 'processing':
+        logger.info(
+            f"Skipping settlement of transaction {transaction.payment_key} "
+            f"in status {transaction.status}"
+        )
+        return None
+
+    gateway = get_gateway()
+    async with semaphore:
+        await asyncio.sleep(gateway.latency())
+        result = await gateway.acharge(transaction)
+
+    _apply_outcome(transaction, result, timezone.now())
+    if not await sync_to_async(_save_settlement)([transaction]):
+        return None
+
+    return transaction.status
+
+
+def _claim(limit):
+    """Claim pending transactions on a healthy connection"""
+    # Drops connections broken by a database restart so the claim reconnects
+    close_old_connections()
+    return claim_pending_transactions(limit)
+
+
+async def run(max_concurrency=None, batch_size=None, poll_interval=None, stop_event=None):
+    """
+    Claim and settle pending transactions until ``stop_event`` is set
+
+    Only as many transactions are claimed as there are free concurrency
+    slots, so claimed rows never wait in the processing state behind a full
+    semaphore; when every slot is busy the loop wakes as soon as one
+    settlement finishes. A failing claim is logged and retried after
+    ``poll_interval``, so a database restart does not stop the engine.
+    In-flight settlements are drained before returning.
+
+    Args:
+        max_concurrency (int): Maximum settlements in flight
+        batch_size (int): Maximum transactions claimed per database round trip
+        poll_interval (float): Seconds to wait when no pending rows are found
+        stop_event (asyncio.Event): Set to stop claiming new transactions
+    """
+    max_concurrency = max_concurrency or settings.TRANSACTION_ASYNC_MAX_CONCURRENCY
+    batch_size = batch_size or settings.TRANSACTION_BATCH_SIZE
+    poll_interval = poll_interval or settings.TRANSACTION_BATCH_INTERVAL_SECONDS
+    stop_event = stop_event or asyncio.Event()
+
+    semaphore = asyncio.BoundedSemaphore(max_concurrency)
+    in_flight = set()
+
+    logger.info(f"Async transaction engine started (max concurrency {max_concurrency})")
+
+    while not stop_event.is_set():
+        free_slots = max_concurrency - len(in_flight)
+        if free_slots <= 0:
+            # Refill as soon as a slot frees up
+            await asyncio.wait(in_flight, timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED)
+            continue
+
+        try:
+            transaction_ids = await sync_to_async(_claim)(min(free_slots, batch_size))
+        except Exception as exc:
+            logger.error(f"Error claiming pending transactions: {str(exc)}")
+            transaction_ids = []
+
+        for transaction_id in transaction_ids:
+            task = asyncio.create_task(settle_transaction(str(transaction_id), semaphore))
+            in_flight.add(task)
+            task.add_done_callback(_settlement_done(in_flight))
+
+        if not transaction_ids:
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    if in_flight:
+        logger.info(f"Waiting for {len(in_flight)} in-flight settlements")
+        await asyncio.gather(*in_flight, return_exceptions=True)
+
+    await get_gateway().aclose()
+    logger.info("Async transaction engine stopped")
+
+
+def _settlement_done(in_flight):
+    """Build a done-callback that untracks a task and logs its failure"""
+    def callback(task):
+        in_flight.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error settling transaction: {str(task.exception())}")
+    return callback
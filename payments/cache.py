@@ -0,0 +1,89 @@
+import logging
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction as db_transaction
+
+logger = logging.getLogger(__name__)
+
+
+def is_cacheable(model, status, db):
+    """
+    Whether a row read by a view may be stored in the cache
+
+    Only terminal rows qualify, since a status with no outgoing transition no
+    longer changes state, and only when read from the primary: invalidation
+    runs on the primary's commit, so a row read from a lagging replica could
+    re-cache the version a worker has just replaced.
+
+    Args:
+        model: Transaction or Refund
+        status (str): Status of the row
+        db (str): Database alias the row was read from
+
+    Returns:
+        bool: True if the row can be cached
+    """
+    return db == DEFAULT_DB_ALIAS and not model.TRANSITIONS[status]
+
+
+def transaction_cache_key(merchant_id, transaction_id):
+    """Cache key of a serialized transaction"""
+    return f'transaction:{merchant_id}:{transaction_id}'
+
+
+def refund_cache_key(merchant_id, refund_id):
+    """Cache key of a serialized refund"""
+    return f'refund:{merchant_id}:{refund_id}'
+
+
+def get_cached(key):
+    """
+    Read a cached representation, treating an unavailable cache as a miss
+
+    Args:
+        key (str): Cache key
+
+    Returns:
+        dict: Stored ``{'etag', 'data'}`` entry, or None
+    """
+    try:
+        return cache.get(key)
+    except redis.RedisError as exc:
+        logger.warning(f"Cache read failed for {key}: {exc}")
+        return None
+
+
+def set_cached(key, etag, data):
+    """
+    Store the representation of a terminal row
+
+    Args:
+        key (str): Cache key
+        etag (str): ETag of the representation
+        data (dict): Serialized representation
+    """
+    try:
+        cache.set(key, {'etag': etag, 'data': dict(data)}, settings.RESOURCE_CACHE_TTL_SECONDS)
+    except redis.RedisError as exc:
+        logger.warning(f"Cache write failed for {key}: {exc}")
+
+
+def invalidate(*keys):
+    """
+    Drop cached representations once the surrounding DB transaction commits
+
+    Deleting after commit keeps a concurrent reader from re-caching the
+    pre-write row in between.
+
+    Args:
+        *keys: Cache keys to delete
+    """
+    def delete():
+        try:
+            cache.delete_many(keys)
+        except redis.RedisError as exc:
+            logger.warning(f"Cache invalidation failed for {len(keys)} keys: {exc}")
+
+    if keys:
+        db_transaction.on_commit(delete)
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import weakref
+import orjson
+import redis
+from django.conf import settings
+from django.db import transaction as db_transaction
+from payment_api.redis_client import get_async_redis, get_redis
+from payment_api.renderers import ORJSON_OPTIONS, orjson_default
+
+logger = logging.getLogger(__name__)
+
+
+def status_channel(transaction_id):
+    """Redis pub/sub channel carrying a transaction's status changes"""
+    return f'transaction_events:{transaction_id}'
+
+
+def status_event(transaction_id, status, failure_reason=None, processed_at=None):
+    """
+    Build a status event payload
+
+    Args:
+        transaction_id: UUID of the transaction
+        status (str): New status
+        failure_reason (str): Failure reason of a failed transaction
+        processed_at (datetime): Settlement timestamp
+
+    Returns:
+        dict: Event payload
+    """
+    return {
+        'id': str(transaction_id),
+        'status': status,
+        'failure_reason': failure_reason,
+        'processed_at': processed_at,
+    }
+
+
+def encode(event):
+    """Serialize an event payload the way the JSON API renders it"""
+    return orjson.dumps(event, default=orjson_default, option=ORJSON_OPTIONS)
+
+
+def _send(events):
+    try:
+        with get_redis().pipeline(transaction=False) as pipe:
+            for event in events:
+                pipe.publish(status_channel(event['id']), encode(event))
+            pipe.execute()
+    except redis.RedisError as exc:
+        # Subscribers still see the change when their stream reconnects
+        logger.warning(f"Could not publish {len(events)} transaction status events: {exc}")
+
+
+def publish(events):
+    """
+    Publish status events once the surrounding DB transaction commits
+
+    Publishing after commit guarantees a subscriber that re-reads the row
+    sees the new status. A Redis failure is logged and dropped.
+
+    Args:
+        events (iterable): Event payloads from ``status_event``
+    """
+    events = list(events)
+    if events:
+        db_transaction.on_commit(lambda: _send(events))
+
+
+class StatusListener:
+    """
+    Shared Redis subscription fanning status events out to open streams
+
+    Every stream of an event loop is served by one pub/sub connection: a
+    channel stays subscribed while at least one stream watches it, and a
+    single reader task puts each message on the queues of that channel's
+    streams. The connection is opened for the first stream and closed with
+    the last one.
+    """
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._queues = {}
+        self._confirmed = {}
+        self._client = None
+        self._pubsub = None
+        self._reader = None
+
+    async def subscribe(self, transaction_id):
+        """
+        Start watching a transaction's status channel
+
+        Returns once Redis confirmed the subscription, so every change
+        published afterwards reaches the returned queue.
+
+        Args:
+            transaction_id: UUID of the transaction
+
+        Returns:
+            asyncio.Queue: Encoded events; ``None`` once Redis is lost
+
+        Raises:
+            redis.RedisError: Redis is unavailable
+        """
+        channel = status_channel(transaction_id).encode()
+        queue = asyncio.Queue()
+
+        async with self._lock:
+            streams = self._queues.setdefault(channel, set())
+            streams.add(queue)
+            if len(streams) > 1:
+                return queue
+
+            try:
+                if self._pubsub is None:
+                    self._client = get_async_redis()
+                    self._pubsub = self._client.pubsub()
+                confirmed = self._confirmed[channel] = asyncio.Event()
+                await self._pubsub.subscribe(channel)
+                if self._reader is None:
+                    self._reader = asyncio.create_task(self._read(self._pubsub))
+                async with asyncio.timeout(settings.REDIS_SOCKET_TIMEOUT_SECONDS):
+                    await confirmed.wait()
+
+            except (redis.RedisError, TimeoutError) as exc:
+                await self._close()
+                if isinstance(exc, redis.RedisError):
+                    raise
+                raise redis.TimeoutError(f"Subscription to {channel.decode()} not confirmed") from exc
+
+        return queue
+
+    async def unsubscribe(self, transaction_id, queue):
+        """
+        Stop delivering a transaction's events to a queue
+
+        Args:
+            transaction_id: UUID of the transaction
+            queue (asyncio.Queue): Queue returned by ``subscribe``
+        """
+        channel = status_channel(transaction_id).encode()
+
+        async with self._lock:
+            streams = self._queues.get(channel)
+            if streams is None or queue not in streams:
+                return
+            streams.discard(queue)
+            if streams:
+                return
+
+            del self._queues[channel]
+            if not self._queues:
+                await self._close()
+                return
+            try:
+                await self._pubsub.unsubscribe(channel)
+            except redis.RedisError as exc:
+                # The reader hits the same error and closes the streams
+                logger.warning(f"Could not unsubscribe from {channel.decode()}: {exc}")
+
+    async def _read(self, pubsub):
+        try:
+            while True:
+                message = await pubsub.get_message(timeout=None)
+                if message is None:
+                    continue
+                if message['type'] == 'subscribe':
+                    confirmed = self._confirmed.pop(message['channel'], None)
+                    if confirmed is not None:
+                        confirmed.set()
+                elif message['type'] == 'message':
+                    for queue in self._queues.get(message['channel'], ()):
+                        queue.put_nowait(message['data'])
+
+        except redis.RedisError as exc:
+            logger.warning(f"Transaction status listener lost Redis: {exc}")
+            async with self._lock:
+                if self._pubsub is pubsub:
+                    await self._close()
+
+    async def _close(self):
+        # Ends every open stream; the next subscriber reconnects
+        for streams in self._queues.values():
+            for queue in streams:
+                queue.put_nowait(None)
+        reader, pubsub, client = self._reader, self._pubsub, self._client
+        self._queues, self._confirmed = {}, {}
+        self._reader = self._pubsub = self._client = None
+
+        if reader is not None and reader is not asyncio.current_task():
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+        if pubsub is not None:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+_listeners = weakref.WeakKeyDictionary()
+
+
+def get_status_listener():
+    """
+    Get the status listener of the running event loop
+
+    Redis asyncio connections are bound to the loop that opened them, so
+    each loop (one per ASGI worker process) gets its own listener.
+
+    Returns:
+        StatusListener: Shared listener
+    """
+    loop = asyncio.get_running_loop()
+    listener = _listeners.get(loop)
+    if listener is None:
+        listener = _listeners[loop] = StatusListener()
+    return listener
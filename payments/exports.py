@@ -0,0 +1,68 @@
+import csv
+from itertools import islice
+import orjson
+from asgiref.sync import sync_to_async
+from payment_api.renderers import ORJSON_OPTIONS, orjson_default
+
+
+class _Echo:
+    """File-like object handing each written line straight back to csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def iter_ndjson(rows):
+    """
+    Encode representations as newline-delimited JSON
+
+    Args:
+        rows (iterable): Serialized rows
+
+    Yields:
+        bytes: One JSON document per row
+    """
+    for row in rows:
+        yield orjson.dumps(row, default=orjson_default, option=ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+
+
+def iter_csv(rows, fieldnames):
+    """
+    Encode representations as CSV with a header line
+
+    Args:
+        rows (iterable): Serialized rows
+        fieldnames (list): Column order
+
+    Yields:
+        str: One CSV line per row
+    """
+    writer = csv.DictWriter(_Echo(), fieldnames=fieldnames)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _next_chunk(iterator, size):
+    return list(islice(iterator, size))
+
+
+async def aiter_chunks(iterator, chunk_size):
+    """
+    Drive a blocking iterator from the event loop, one chunk per thread hop
+
+    Under ASGI Django would drain a synchronous streaming iterator into a
+    list before sending anything. Pulling ``chunk_size`` items at a time
+    through ``sync_to_async`` keeps the export lazy; the thread-sensitive
+    executor keeps every pull on the thread that owns the DB cursor.
+
+    Args:
+        iterator (iterator): Blocking iterator, e.g. encoded export lines
+        chunk_size (int): Items pulled per thread hop
+
+    Yields:
+        Items of ``iterator``
+    """
+    while chunk := await sync_to_async(_next_chunk)(iterator, chunk_size):
+        for item in chunk:
+            yield item
@@ -0,0 +1,247 @@
+"""
+Payment processor gateways
+
+The task code talks to the processor only through ``get_gateway()``, so the
+backend can be switched with ``PAYMENT_GATEWAY_BACKEND`` without touching
+the processing pipeline.
+"""
+import asyncio
+import os
+import random
+from collections import namedtuple
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+ChargeResult = namedtuple('ChargeResult', ['success', 'failure_reason'])
+
+_gateways = {}
+
+
+class GatewayError(Exception):
+    """Raised when the processor cannot be reached or returns an invalid response"""
+
+
+class PaymentGateway:
+    """Base class for payment processor backends"""
+
+    def latency(self):
+        """
+        Simulated latency callers should wait before charging
+
+        Returns:
+            float: Delay in seconds
+        """
+        return 0
+
+    def charge(self, transaction):
+        """
+        Charge a transaction with the processor
+
+        Args:
+            transaction (Transaction): Transaction to charge
+
+        Returns:
+            ChargeResult: Processor outcome
+        """
+        raise NotImplementedError
+
+    async def acharge(self, transaction):
+        """
+        Charge a transaction from an event loop
+
+        Backends without a native async client run ``charge`` in the default
+        thread pool, which caps the calls in flight at its size.
+
+        Args:
+            transaction (Transaction): Transaction to charge
+
+        Returns:
+            ChargeResult: Processor outcome
+        """
+        return await sync_to_async(self.charge, thread_sensitive=False)(transaction)
+
+    async def aclose(self):
+        """Release connections opened by ``acharge``"""
+
+    def refund(self, refund):
+        """
+        Return part or all of a charged amount to the customer
+
+        Args:
+            refund (Refund): Refund to send, with its transaction
+
+        Returns:
+            ChargeResult: Processor outcome
+        """
+        raise NotImplementedError
+
+
+class SimulatedGateway(PaymentGateway):
+    """In-process processor driven by the TRANSACTION_* simulation settings"""
+
+    def latency(self):
+        return random.uniform(
+            settings.TRANSACTION_PROCESSING_MIN_DELAY,
+            settings.TRANSACTION_PROCESSING_MAX_DELAY
+        )
+
+    def charge(self, transaction):
+        # Determine success based on configured rate
+        if random.random() < settings.TRANSACTION_SUCCESS_RATE:
+            return ChargeResult(success=True, failure_reason=None)
+        return ChargeResult(
+            success=False,
+            failure_reason='Payment processing failed (simulated failure)'
+        )
+
+    async def acharge(self, transaction):
+        # Nothing blocks, so no thread hop is needed
+        return self.charge(transaction)
+
+    def refund(self, refund):
+        if random.random() < settings.REFUND_SUCCESS_RATE:
+            return ChargeResult(success=True, failure_reason=None)
+        return ChargeResult(
+            success=False,
+            failure_reason='Refund processing failed (simulated failure)'
+        )
+
+
+class HTTPGateway(PaymentGateway):
+    """
+    Processor reached over HTTP through a pooled keep-alive session
+
+    Blocking calls share a ``requests`` session bounded by
+    ``PAYMENT_GATEWAY_POOL_SIZE``. ``acharge`` uses a separate ``httpx``
+    async client whose pool is sized by ``TRANSACTION_ASYNC_MAX_CONCURRENCY``,
+    so the async engine keeps that many charges in flight without threads.
+    """
+
+    def __init__(self, base_url=None, timeout=None, connect_timeout=None, pool_size=None):
+        self.base_url = (base_url or settings.PAYMENT_GATEWAY_URL).rstrip('/')
+        self.timeout = (
+            connect_timeout or settings.PAYMENT_GATEWAY_CONNECT_TIMEOUT_SECONDS,
+            timeout or settings.PAYMENT_GATEWAY_TIMEOUT_SECONDS,
+        )
+        pool_size = pool_size or settings.PAYMENT_GATEWAY_POOL_SIZE
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # Bound to the event loop it was created in
+        self._async_client = None
+        self._async_loop = None
+
+    def _post(self, path, body, idempotency_key, declined_reason):
+        """
+        Send one request to the processor and map its answer to a ChargeResult
+
+        The ``Idempotency-Key`` header is stable per charge or refund, so a
+        redelivered task gets the processor's first answer back instead of
+        moving the money twice.
+        """
+        try:
+            response = self.session.post(
+                f'{self.base_url}{path}',
+                json=body,
+                headers={'Idempotency-Key': idempotency_key},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as exc:
+            raise GatewayError(f'Processor request failed: {str(exc)}') from exc
+
+        return self._result(data, declined_reason)
+
+    async def _apost(self, path, body, idempotency_key, declined_reason):
+        """Async counterpart of ``_post`` over the httpx client"""
+        try:
+            response = await self._get_async_client().post(
+                path, json=body, headers={'Idempotency-Key': idempotency_key}
+            )
+            response.raise_for_status()
+            data = response.json()
+        except (httpx.HTTPError, ValueError) as exc:
+            raise GatewayError(f'Processor request failed: {str(exc)}') from exc
+
+        return self._result(data, declined_reason)
+
+    def _get_async_client(self):
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            limit = settings.TRANSACTION_ASYNC_MAX_CONCURRENCY
+            self._async_client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+                limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit)
+            )
+            self._async_loop = loop
+        return self._async_client
+
+    @staticmethod
+    def _result(data, declined_reason):
+        """Map a processor answer to a ChargeResult"""
+        if data.get('status') == 'succeeded':
+            return ChargeResult(success=True, failure_reason=None)
+        return ChargeResult(
+            success=False,
+            failure_reason=data.get('failure_reason') or declined_reason
+        )
+
+    @staticmethod
+    def _charge_body(transaction):
+        return {
+            'transaction_id': str(transaction.id),
+            'payment_key': transaction.payment_key,
+            'amount': str(transaction.amount),
+            'currency': transaction.currency,
+        }
+
+    def charge(self, transaction):
+        return self._post(
+            '/charges', self._charge_body(transaction),
+            f'charge-{transaction.id}', 'Payment declined by processor'
+        )
+
+    async def acharge(self, transaction):
+        return await self._apost(
+            '/charges', self._charge_body(transaction),
+            f'charge-{transaction.id}', 'Payment declined by processor'
+        )
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def refund(self, refund):
+        return self._post('/refunds', {
+            'refund_id': str(refund.id),
+            'transaction_id': str(refund.transaction_id),
+            'payment_key': refund.transaction.payment_key,
+            'amount': str(refund.amount),
+            'currency': refund.transaction.currency,
+        }, f'refund-{refund.id}', 'Refund declined by processor')
+
+
+def get_gateway():
+    """
+    Get the configured gateway for the current process
+
+    Instances are cached per process id so that each forked worker owns its
+    own connection pool.
+
+    Returns:
+        PaymentGateway: Gateway instance
+    """
+    key = (os.getpid(), settings.PAYMENT_GATEWAY_BACKEND)
+    if key not in _gateways:
+        _gateways[key] = import_string(settings.PAYMENT_GATEWAY_BACKEND)()
+    return _gateways[key]
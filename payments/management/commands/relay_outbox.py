@@ -0,0 +1,42 @@
+import time
+import logging
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from payments.outbox import relay_batch
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Publish queued outbox messages to the Celery broker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_RELAY_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=settings.OUTBOX_RELAY_INTERVAL_SECONDS)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        interval = options['interval']
+        self.stdout.write(f"Relaying outbox in batches of {batch_size}")
+
+        failures = 0
+        try:
+            while True:
+                close_old_connections()
+                try:
+                    relayed = relay_batch(batch_size)
+                except Exception as exc:
+                    # Messages stay queued; back off until the broker or database is back
+                    failures += 1
+                    delay = min(interval * 2 ** failures, settings.OUTBOX_RELAY_MAX_BACKOFF_SECONDS)
+                    logger.error(f"Outbox relay failed, retrying in {delay:.1f}s: {str(exc)}")
+                    time.sleep(delay)
+                    continue
+
+                failures = 0
+                # Only idle when the outbox has been drained
+                if relayed < batch_size:
+                    time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
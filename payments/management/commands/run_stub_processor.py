@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from payments.stub_processor import StubProcessorServer
+
+
+class Command(BaseCommand):
+    help = 'Run the local stub payment processor'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='0.0.0.0')
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument('--success-rate', type=float, default=settings.TRANSACTION_SUCCESS_RATE)
+        parser.add_argument('--min-delay', type=float, default=settings.TRANSACTION_PROCESSING_MIN_DELAY)
+        parser.add_argument('--max-delay', type=float, default=settings.TRANSACTION_PROCESSING_MAX_DELAY)
+
+    def handle(self, *args, **options):
+        server = StubProcessorServer(
+            (options['host'], options['port']),
+            success_rate=options['success_rate'],
+            min_delay=options['min_delay'],
+            max_delay=options['max_delay']
+        )
+        self.stdout.write(f"Stub processor listening on {options['host']}:{options['port']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
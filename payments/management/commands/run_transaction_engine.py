@@ -0,0 +1,23 @@
+import asyncio
+import signal
+from django.core.management.base import BaseCommand
+from payments.async_engine import run
+
+
+class Command(BaseCommand):
+    help = 'Run the asyncio transaction processing engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, help='Maximum settlements in flight')
+        parser.add_argument('--batch-size', type=int, help='Maximum transactions claimed per query')
+
+    def handle(self, *args, **options):
+        asyncio.run(self._run(options['concurrency'], options['batch_size']))
+
+    async def _run(self, concurrency, batch_size):
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
+
+        await run(max_concurrency=concurrency, batch_size=batch_size, stop_event=stop_event)
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0003_transaction_transactions_in_flight_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="transaction",
+            name="transaction_created_cf5536_idx",
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["merchant", "-created_at", "-id"],
+                name="transaction_merchan_f10295_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:29
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0004_remove_transaction_transaction_created_cf5536_idx_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MerchantSummary",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("transaction", "Transaction"), ("refund", "Refund")],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "currency",
+                    models.CharField(
+                        choices=[
+                            ("USD", "US Dollar"),
+                            ("EUR", "Euro"),
+                            ("GBP", "British Pound"),
+                            ("EGP", "Egyptian Pound"),
+                        ],
+                        max_length=3,
+                    ),
+                ),
+                ("status", models.CharField(max_length=20)),
+                ("count", models.BigIntegerField(default=0)),
+                (
+                    "total_amount",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=18
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "merchant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="summaries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Merchant Summary",
+                "verbose_name_plural": "Merchant Summaries",
+                "db_table": "merchant_summaries",
+                "ordering": ["kind", "currency", "status"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("merchant", "kind", "currency", "status"),
+                        name="merchant_summary_unique_bucket",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def backfill(apps, schema_editor):
+    """Seed the summary buckets from the settled rows that already exist"""
+    Transaction = apps.get_model('payments', 'Transaction')
+    Refund = apps.get_model('payments', 'Refund')
+    MerchantSummary = apps.get_model('payments', 'MerchantSummary')
+
+    transactions = (
+        Transaction.objects.filter(status__in=['succeeded', 'failed'])
+        .values('merchant_id', 'currency', 'status')
+        .annotate(count=Count('id'), total_amount=Sum('amount'))
+        .order_by()
+    )
+    refunds = (
+        Refund.objects.filter(status__in=['succeeded', 'failed'])
+        .values('transaction__merchant_id', 'transaction__currency', 'status')
+        .annotate(count=Count('id'), total_amount=Sum('amount'))
+        .order_by()
+    )
+
+    MerchantSummary.objects.bulk_create([
+        MerchantSummary(
+            merchant_id=row['merchant_id'], kind='transaction', currency=row['currency'],
+            status=row['status'], count=row['count'], total_amount=row['total_amount']
+        )
+        for row in transactions
+    ] + [
+        MerchantSummary(
+            merchant_id=row['transaction__merchant_id'], kind='refund',
+            currency=row['transaction__currency'], status=row['status'],
+            count=row['count'], total_amount=row['total_amount']
+        )
+        for row in refunds
+    ], batch_size=1000)
+
+
+def clear(apps, schema_editor):
+    apps.get_model('payments', 'MerchantSummary').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0005_merchantsummary"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, clear),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:33
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0006_backfill_merchantsummary"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RollupWatermark",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("value", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name": "Rollup Watermark",
+                "verbose_name_plural": "Rollup Watermarks",
+                "db_table": "rollup_watermarks",
+            },
+        ),
+        migrations.CreateModel(
+            name="TransactionRollup",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[("hour", "Hour"), ("day", "Day")], max_length=10
+                    ),
+                ),
+                ("bucket_start", models.DateTimeField()),
+                (
+                    "currency",
+                    models.CharField(
+                        choices=[
+                            ("USD", "US Dollar"),
+                            ("EUR", "Euro"),
+                            ("GBP", "British Pound"),
+                            ("EGP", "Egyptian Pound"),
+                        ],
+                        max_length=3,
+                    ),
+                ),
+                ("created_count", models.BigIntegerField(default=0)),
+                ("succeeded_count", models.BigIntegerField(default=0)),
+                ("failed_count", models.BigIntegerField(default=0)),
+                (
+                    "volume",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=18
+                    ),
+                ),
+                ("refund_count", models.BigIntegerField(default=0)),
+                (
+                    "refund_volume",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=18
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Transaction Rollup",
+                "verbose_name_plural": "Transaction Rollups",
+                "db_table": "transaction_rollups",
+                "ordering": ["bucket_start"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="refund",
+            index=models.Index(
+                fields=["processed_at"], name="refunds_processed_at_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=django.contrib.postgres.indexes.BrinIndex(
+                fields=["created_at"], name="transactions_created_brin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["processed_at"], name="transactions_processed_at_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="transactionrollup",
+            name="merchant",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="rollups",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="transactionrollup",
+            constraint=models.UniqueConstraint(
+                fields=("merchant", "granularity", "bucket_start", "currency"),
+                name="transaction_rollup_unique_bucket",
+            ),
+        ),
+    ]
@@ -0,0 +1,61 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from payment_api.partitioning import convert_to_partitioned
+
+# The partition maintenance task keeps this many months ready from then on
+MONTHS_AHEAD = 3
+
+
+def partition_transactions(apps, schema_editor):
+    """Rebuild transactions as a monthly range-partitioned table"""
+    convert_to_partitioned(schema_editor, 'transactions', MONTHS_AHEAD)
+
+    # The varchar_pattern_ops index belonged to the old unique payment_key field
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname FROM pg_indexes WHERE tablename = %s AND indexname LIKE %s",
+            ['transactions', 'transactions_payment_key_%_like']
+        )
+        for (name,) in cursor.fetchall():
+            cursor.execute(f'DROP INDEX {schema_editor.quote_name(name)}')
+
+
+class Migration(migrations.Migration):
+
+    # webhook_logs must exist first so that its foreign key to transactions is dropped here
+    dependencies = [
+        ('payments', '0007_transactionrollup'),
+        ('webhooks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(partition_transactions),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='refund',
+                    name='transaction',
+                    field=models.OneToOneField(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='refund',
+                        to='payments.transaction'
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name='transaction',
+                    name='payment_key',
+                    field=models.CharField(max_length=64),
+                ),
+                migrations.AddConstraint(
+                    model_name='transaction',
+                    constraint=models.UniqueConstraint(
+                        fields=('payment_key', 'created_at'),
+                        name='transactions_payment_key_key'
+                    ),
+                ),
+            ],
+        ),
+    ]
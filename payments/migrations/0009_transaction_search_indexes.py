@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:46
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import BtreeGinExtension, TrigramExtension
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0008_partition_transactions"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        BtreeGinExtension(),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["merchant", "description"],
+                name="transactions_desc_trgm_idx",
+                opclasses=["uuid_ops", "gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["merchant", "payment_key"],
+                name="transactions_key_prefix_idx",
+                opclasses=["uuid_ops", "varchar_pattern_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:55
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+
+
+def backfill_refunded_amount(apps, schema_editor):
+    """Total the refunds already issued against each transaction"""
+    Transaction = apps.get_model('payments', 'Transaction')
+    Refund = apps.get_model('payments', 'Refund')
+
+    issued = Refund.objects.filter(status__in=['pending', 'succeeded'])
+    totals = (
+        issued.filter(transaction=OuterRef('pk'))
+        .values('transaction')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    Transaction.objects.filter(
+        id__in=issued.values('transaction')
+    ).update(refunded_amount=Subquery(totals))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0009_transaction_search_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="refunded_amount",
+            field=models.DecimalField(
+                decimal_places=2, default=Decimal("0.00"), max_digits=10
+            ),
+        ),
+        migrations.AlterField(
+            model_name="refund",
+            name="transaction",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="refunds",
+                to="payments.transaction",
+            ),
+        ),
+        migrations.RunPython(backfill_refunded_amount, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="transaction",
+            constraint=models.CheckConstraint(
+                condition=models.Q(
+                    ("refunded_amount__gte", 0),
+                    ("refunded_amount__lte", models.F("amount")),
+                ),
+                name="transactions_refunded_amount_range",
+            ),
+        ),
+    ]
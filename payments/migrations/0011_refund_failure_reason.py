@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0010_refund_ledger"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="refund",
+            name="failure_reason",
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
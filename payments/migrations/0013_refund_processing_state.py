@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-17 05:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0012_transaction_search_upper_trgm"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="refund",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("succeeded", "Succeeded"),
+                    ("failed", "Failed"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="refund",
+            index=models.Index(
+                condition=models.Q(("status__in", ["pending", "processing"])),
+                fields=["updated_at"],
+                name="refunds_in_flight_idx",
+            ),
+        ),
+    ]
@@ -1,10 +1,117 @@
 import uuid
-from django.db import models
+from django.db import connections, models
 from django.conf import settings
+from django.contrib.postgres.indexes import BrinIndex, GinIndex, OpClass
 from django.core.validators import MinValueValidator
+from django.db.models.functions import Upper
+from django.utils import timezone
 from decimal import Decimal
 
 
+class StatusQuerySet(models.QuerySet):
+    """QuerySet with compare-and-set status transitions"""
+
+    def transition(self, to_status, **values):
+        """
+        Move matching rows to ``to_status`` with a single conditional UPDATE
+
+        Only rows whose current status may lead to ``to_status`` according to
+        the model's ``TRANSITIONS`` are updated, so a retried or duplicated
+        message can never overwrite a state it is not allowed to leave.
+
+        Args:
+            to_status (str): Target status
+            **values: Additional fields to set in the same UPDATE
+
+        Returns:
+            int: Number of rows that made the transition
+        """
+        from_statuses = [
+            status for status, targets in self.model.TRANSITIONS.items()
+            if to_status in targets
+        ]
+        if not from_statuses:
+            raise ValueError(f"No transition leads to status '{to_status}'")
+
+        values.setdefault('updated_at', timezone.now())
+        return self.filter(status__in=from_statuses).update(status=to_status, **values)
+
+
+class TransactionQuerySet(StatusQuerySet):
+    """QuerySet for transactions"""
+
+    def reserve_refund(self, amount):
+        """
+        Add ``amount`` to the refunded total with a single conditional UPDATE
+
+        The row is only updated while the transaction is succeeded and the
+        new total stays within its amount. Concurrent refunds of the same
+        transaction queue on the row lock and each re-checks the condition
+        against the committed total, so the transaction is never over-refunded.
+
+        Args:
+            amount (Decimal): Refund amount
+
+        Returns:
+            int: Number of rows that had room for the refund
+        """
+        return self.filter(
+            status='succeeded',
+            refunded_amount__lte=models.F('amount') - amount
+        ).update(
+            refunded_amount=models.F('refunded_amount') + amount,
+            updated_at=timezone.now()
+        )
+
+    def set_refunded_amounts(self, totals, updated_at):
+        """
+        Write new refunded totals of many transactions with a single UPDATE
+
+        The totals are joined in as a ``VALUES`` list, so the statement stays
+        linear in the number of rows where ``bulk_update`` builds a CASE per
+        row and column.
+
+        Args:
+            totals (dict): New refunded total by transaction id
+            updated_at (datetime): Timestamp stored on every updated row
+
+        Returns:
+            int: Number of updated rows
+        """
+        if not totals:
+            return 0
+
+        self._for_write = True
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        table = quote(self.model._meta.db_table)
+        rows = ', '.join(['(%s::uuid, %s::numeric)'] * len(totals))
+        params = [value for row in totals.items() for value in row]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET refunded_amount = v.refunded_amount, updated_at = %s '
+                f'FROM (VALUES {rows}) AS v(id, refunded_amount) WHERE {table}.id = v.id',
+                [updated_at, *params]
+            )
+            return cursor.rowcount
+
+    def release_refund(self, amount):
+        """
+        Take a failed refund's amount back out of the refunded total
+
+        Args:
+            amount (Decimal): Amount reserved by the failed refund
+
+        Returns:
+            int: Number of updated rows
+        """
+        return self.update(
+            refunded_amount=models.F('refunded_amount') - amount,
+            updated_at=timezone.now()
+        )
+
+
 class Transaction(models.Model):
     """Model for payment transactions"""
 
@@ -15,6 +122,14 @@ class Transaction(models.Model):
         ('failed', 'Failed'),
     ]
 
+    # Allowed status transitions; processing may fall back to pending when re-driven
+    TRANSITIONS = {
+        'pending': ['processing'],
+        'processing': ['succeeded', 'failed', 'pending'],
+        'succeeded': [],
+        'failed': [],
+    }
+
     CURRENCY_CHOICES = [
         ('USD', 'US Dollar'),
         ('EUR', 'Euro'),
@@ -36,21 +151,59 @@ class Transaction(models.Model):
     currency = models.CharField(max_length=3, choices=CURRENCY_CHOICES, default='USD')
     description = models.TextField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
-    payment_key = models.CharField(max_length=64, unique=True, db_index=True)
+    payment_key = models.CharField(max_length=64)
+    # Sum of the refunds issued against this transaction, kept by reserve_refund()
+    refunded_amount = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
     failure_reason = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
     processed_at = models.DateTimeField(null=True, blank=True)
 
+    objects = TransactionQuerySet.as_manager()
+
     class Meta:
         db_table = 'transactions'
         verbose_name = 'Transaction'
         verbose_name_plural = 'Transactions'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['-created_at']),
+            # Serves per-merchant listings and keyset pagination
+            models.Index(fields=['merchant', '-created_at', '-id']),
             models.Index(fields=['merchant', 'status']),
             models.Index(fields=['payment_key']),
+            # Covers only in-flight rows so the reconciliation sweep stays O(in-flight)
+            models.Index(
+                fields=['updated_at'],
+                name='transactions_in_flight_idx',
+                condition=models.Q(status__in=['pending', 'processing'])
+            ),
+            # Range scans of the analytics rollup; BRIN stays tiny on an append-only column
+            BrinIndex(fields=['created_at'], name='transactions_created_brin'),
+            models.Index(fields=['processed_at'], name='transactions_processed_at_idx'),
+            # Per-merchant search: substring matches on description (pg_trgm + btree_gin)
+            # and prefix matches on payment_key. icontains compiles to
+            # UPPER(description) LIKE UPPER(...), so the trigrams index that expression
+            GinIndex(
+                OpClass(models.F('merchant'), name='uuid_ops'),
+                OpClass(Upper('description'), name='gin_trgm_ops'),
+                name='transactions_desc_trgm_idx'
+            ),
+            models.Index(
+                fields=['merchant', 'payment_key'],
+                name='transactions_key_prefix_idx',
+                opclasses=['uuid_ops', 'varchar_pattern_ops']
+            ),
+        ]
+        constraints = [
+            # The table is partitioned by created_at, which every unique key has to include
+            models.UniqueConstraint(
+                fields=['payment_key', 'created_at'],
+                name='transactions_payment_key_key'
+            ),
+            models.CheckConstraint(
+                condition=models.Q(refunded_amount__gte=0, refunded_amount__lte=models.F('amount')),
+                name='transactions_refunded_amount_range'
+            ),
         ]
 
     def __str__(self):
@@ -63,10 +216,15 @@ class Transaction(models.Model):
             self.payment_key = generate_payment_key()
         super().save(*args, **kwargs)
 
+    @property
+    def refundable_amount(self):
+        """Amount that can still be refunded"""
+        return self.amount - self.refunded_amount
+
     @property
     def is_refundable(self):
         """Check if transaction can be refunded"""
-        return self.status == 'succeeded' and not hasattr(self, 'refund')
+        return self.status == 'succeeded' and self.refunded_amount < self.amount
 
 
 class Refund(models.Model):
@@ -74,15 +232,26 @@ class Refund(models.Model):
 
     STATUS_CHOICES = [
         ('pending', 'Pending'),
+        ('processing', 'Processing'),
         ('succeeded', 'Succeeded'),
         ('failed', 'Failed'),
     ]
 
+    # Same lifecycle as transactions: claimed before the processor is called
+    TRANSITIONS = {
+        'pending': ['processing'],
+        'processing': ['succeeded', 'failed', 'pending'],
+        'succeeded': [],
+        'failed': [],
+    }
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    transaction = models.OneToOneField(
+    # No database constraint: foreign keys cannot target the partitioned transactions table
+    transaction = models.ForeignKey(
         Transaction,
         on_delete=models.CASCADE,
-        related_name='refund'
+        related_name='refunds',
+        db_constraint=False
     )
     amount = models.DecimalField(
         max_digits=10,
@@ -91,15 +260,27 @@ class Refund(models.Model):
     )
     reason = models.TextField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    failure_reason = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     processed_at = models.DateTimeField(null=True, blank=True)
 
+    objects = StatusQuerySet.as_manager()
+
     class Meta:
         db_table = 'refunds'
         verbose_name = 'Refund'
         verbose_name_plural = 'Refunds'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['processed_at'], name='refunds_processed_at_idx'),
+            # Covers only in-flight rows so the reconciliation sweep stays O(in-flight)
+            models.Index(
+                fields=['updated_at'],
+                name='refunds_in_flight_idx',
+                condition=models.Q(status__in=['pending', 'processing'])
+            ),
+        ]
 
     def __str__(self):
         return f"Refund for {self.transaction.payment_key} - {self.amount} {self.transaction.currency}"
@@ -114,3 +295,138 @@ class Refund(models.Model):
         """Validate before saving"""
         self.clean()
         super().save(*args, **kwargs)
+
+
+class OutboxMessage(models.Model):
+    """Celery task publication recorded in the same database transaction as its data"""
+
+    id = models.BigAutoField(primary_key=True)
+    task_name = models.CharField(max_length=255)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'outbox_messages'
+        verbose_name = 'Outbox Message'
+        verbose_name_plural = 'Outbox Messages'
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.task_name} {self.args}"
+
+
+class MerchantSummary(models.Model):
+    """
+    Running count and total of settled transactions and refunds per merchant
+
+    One row per (merchant, kind, currency, status), maintained incrementally
+    with ``F()`` updates so the dashboard summary is read in constant time.
+    """
+
+    KIND_CHOICES = [
+        ('transaction', 'Transaction'),
+        ('refund', 'Refund'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    merchant = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='summaries'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    currency = models.CharField(max_length=3, choices=Transaction.CURRENCY_CHOICES)
+    status = models.CharField(max_length=20)
+    count = models.BigIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'merchant_summaries'
+        verbose_name = 'Merchant Summary'
+        verbose_name_plural = 'Merchant Summaries'
+        ordering = ['kind', 'currency', 'status']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['merchant', 'kind', 'currency', 'status'],
+                name='merchant_summary_unique_bucket'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.merchant_id} {self.kind} {self.status} {self.currency}: {self.count}"
+
+
+class TransactionRollup(models.Model):
+    """
+    Transaction and refund activity per merchant and currency in one time bucket
+
+    Built incrementally by ``build_analytics_rollups`` so analytics never
+    aggregate the transactions table directly.
+    """
+
+    GRANULARITY_CHOICES = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    merchant = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='rollups'
+    )
+    currency = models.CharField(max_length=3, choices=Transaction.CURRENCY_CHOICES)
+    # Transactions created in the bucket
+    created_count = models.BigIntegerField(default=0)
+    # Transactions settled in the bucket
+    succeeded_count = models.BigIntegerField(default=0)
+    failed_count = models.BigIntegerField(default=0)
+    volume = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    # Refunds settled in the bucket
+    refund_count = models.BigIntegerField(default=0)
+    refund_volume = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        db_table = 'transaction_rollups'
+        verbose_name = 'Transaction Rollup'
+        verbose_name_plural = 'Transaction Rollups'
+        ordering = ['bucket_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['merchant', 'granularity', 'bucket_start', 'currency'],
+                name='transaction_rollup_unique_bucket'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.merchant_id} {self.granularity} {self.bucket_start} {self.currency}"
+
+    @property
+    def success_rate(self):
+        """Share of settled transactions that succeeded"""
+        settled = self.succeeded_count + self.failed_count
+        return self.succeeded_count / settled if settled else None
+
+    @property
+    def refund_rate(self):
+        """Refunds settled per succeeded transaction"""
+        return self.refund_count / self.succeeded_count if self.succeeded_count else None
+
+
+class RollupWatermark(models.Model):
+    """Timestamp up to which one source has been folded into the rollups"""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.DateTimeField()
+
+    class Meta:
+        db_table = 'rollup_watermarks'
+        verbose_name = 'Rollup Watermark'
+        verbose_name_plural = 'Rollup Watermarks'
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
@@ -5,5 +5,7 @@ app_name = 'refunds'
 
 urlpatterns = [
     path('', views.create_refund, name='create-refund'),
+    path('bulk/', views.bulk_create_refunds, name='bulk-create-refunds'),
+    path('list/', views.list_refunds, name='list-refunds'),
     path('<uuid:refund_id>/', views.get_refund, name='get-refund'),
 ]
@@ -1,6 +1,10 @@
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Transaction, Refund
+from .models import MerchantSummary, Transaction, TransactionRollup, Refund
+from payment_api.fast_serializers import ValuesSerializer, as_datetime, as_decimal, as_string
 from payment_api.utils import generate_payment_key
+from datetime import timedelta
 from decimal import Decimal
 
 
@@ -14,11 +18,11 @@ class TransactionSerializer(serializers.ModelSerializer):
         model = Transaction
         fields = [
             'id', 'merchant_email', 'amount', 'currency', 'description',
-            'status', 'payment_key', 'failure_reason', 'is_refundable',
+            'status', 'payment_key', 'failure_reason', 'refunded_amount', 'is_refundable',
             'created_at', 'updated_at', 'processed_at'
         ]
         read_only_fields = [
-            'id', 'status', 'payment_key', 'failure_reason',
+            'id', 'status', 'payment_key', 'failure_reason', 'refunded_amount',
             'created_at', 'updated_at', 'processed_at', 'merchant_email', 'is_refundable'
         ]
 
@@ -31,6 +35,30 @@ class TransactionSerializer(serializers.ModelSerializer):
         return value
 
 
+class TransactionFastSerializer(ValuesSerializer):
+    """Read-only fast path producing the same output as TransactionSerializer"""
+
+    fields = (
+        ('id', 'id', as_string),
+        ('merchant_email', 'merchant__email', None),
+        ('amount', 'amount', as_decimal(2)),
+        ('currency', 'currency', None),
+        ('description', 'description', None),
+        ('status', 'status', None),
+        ('payment_key', 'payment_key', None),
+        ('failure_reason', 'failure_reason', None),
+        ('refunded_amount', 'refunded_amount', as_decimal(2)),
+        (
+            'is_refundable',
+            lambda row: row['status'] == 'succeeded' and row['refunded_amount'] < row['amount'],
+            None
+        ),
+        ('created_at', 'created_at', as_datetime),
+        ('updated_at', 'updated_at', as_datetime),
+        ('processed_at', 'processed_at', as_datetime),
+    )
+
+
 class TransactionCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating transactions"""
 
@@ -52,6 +80,65 @@ class TransactionCreateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class BulkTransactionCreateSerializer(serializers.Serializer):
+    """Serializer for the envelope of a bulk transaction request"""
+
+    transactions = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+    def validate_transactions(self, value):
+        """Validate batch size"""
+        if len(value) > settings.TRANSACTION_BULK_MAX_ITEMS:
+            raise serializers.ValidationError(
+                f'A batch can contain at most {settings.TRANSACTION_BULK_MAX_ITEMS} transactions'
+            )
+        return value
+
+    def validate_items(self):
+        """
+        Validate every item against TransactionCreateSerializer in one pass
+
+        Returns:
+            tuple: (list of (index, validated_data), dict of index -> errors)
+        """
+        child = TransactionCreateSerializer()
+        valid, errors = [], {}
+        for index, item in enumerate(self.validated_data['transactions']):
+            try:
+                valid.append((index, child.run_validation(item)))
+            except serializers.ValidationError as exc:
+                errors[index] = exc.detail
+        return valid, errors
+
+
+class TransactionExportSerializer(serializers.Serializer):
+    """Serializer for transaction export query parameters"""
+
+    output = serializers.ChoiceField(choices=['ndjson', 'csv'], default='ndjson')
+    status = serializers.ChoiceField(choices=Transaction.STATUS_CHOICES, required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        """Validate the date range"""
+        created_after = data.get('created_after')
+        created_before = data.get('created_before')
+        if created_after and created_before and created_after >= created_before:
+            raise serializers.ValidationError('created_after must be earlier than created_before')
+        return data
+
+
+class TransactionSearchSerializer(serializers.Serializer):
+    """Serializer for transaction search query parameters"""
+
+    # Trigram indexes cannot serve substrings shorter than three characters
+    q = serializers.CharField(min_length=3, max_length=100, trim_whitespace=True)
+    limit = serializers.IntegerField(min_value=1, required=False)
+
+    def validate_limit(self, value):
+        """Cap the number of results"""
+        return min(value, settings.TRANSACTION_SEARCH_MAX_RESULTS)
+
+
 class RefundSerializer(serializers.ModelSerializer):
     """Serializer for refunds"""
 
@@ -68,11 +155,11 @@ class RefundSerializer(serializers.ModelSerializer):
         model = Refund
         fields = [
             'id', 'transaction', 'transaction_payment_key', 'transaction_amount',
-            'amount', 'currency', 'reason', 'status',
+            'amount', 'currency', 'reason', 'status', 'failure_reason',
             'created_at', 'updated_at', 'processed_at'
         ]
         read_only_fields = [
-            'id', 'status', 'created_at', 'updated_at', 'processed_at',
+            'id', 'status', 'failure_reason', 'created_at', 'updated_at', 'processed_at',
             'transaction_payment_key', 'transaction_amount', 'currency'
         ]
 
@@ -87,16 +174,11 @@ class RefundSerializer(serializers.ModelSerializer):
                 'transaction': 'Can only refund succeeded transactions'
             })
 
-        # Check if already refunded
-        if hasattr(transaction, 'refund'):
+        # Early rejection only; the ledger update in create_refund is what
+        # enforces the limit when refunds race
+        if amount > transaction.refundable_amount:
             raise serializers.ValidationError({
-                'transaction': 'Transaction already has a refund'
-            })
-
-        # Validate refund amount
-        if amount > transaction.amount:
-            raise serializers.ValidationError({
-                'amount': f'Refund amount cannot exceed transaction amount ({transaction.amount})'
+                'amount': f'Refund amount cannot exceed refundable amount ({transaction.refundable_amount})'
             })
 
         if amount <= Decimal('0'):
@@ -107,6 +189,109 @@ class RefundSerializer(serializers.ModelSerializer):
         return data
 
 
+class RefundItemSerializer(serializers.Serializer):
+    """
+    Field validation of one bulk refund item
+
+    The transaction is checked by the bulk view for the whole batch at once,
+    so this serializer never touches the database.
+    """
+
+    transaction = serializers.UUIDField()
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    reason = serializers.CharField()
+
+
+class BulkRefundCreateSerializer(serializers.Serializer):
+    """Serializer for the envelope of a bulk refund request"""
+
+    refunds = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+    def validate_refunds(self, value):
+        """Validate batch size"""
+        if len(value) > settings.REFUND_BULK_MAX_ITEMS:
+            raise serializers.ValidationError(
+                f'A batch can contain at most {settings.REFUND_BULK_MAX_ITEMS} refunds'
+            )
+        return value
+
+    def validate_items(self):
+        """
+        Validate every item against RefundItemSerializer in one pass
+
+        Returns:
+            tuple: (list of (index, validated_data), dict of index -> errors)
+        """
+        child = RefundItemSerializer()
+        valid, errors = [], {}
+        for index, item in enumerate(self.validated_data['refunds']):
+            try:
+                valid.append((index, child.run_validation(item)))
+            except serializers.ValidationError as exc:
+                errors[index] = exc.detail
+        return valid, errors
+
+
+class RefundFastSerializer(ValuesSerializer):
+    """Read-only fast path producing the same output as RefundSerializer"""
+
+    fields = (
+        ('id', 'id', as_string),
+        ('transaction', 'transaction_id', as_string),
+        ('transaction_payment_key', 'transaction__payment_key', None),
+        ('transaction_amount', 'transaction__amount', as_decimal(2)),
+        ('amount', 'amount', as_decimal(2)),
+        ('currency', 'transaction__currency', None),
+        ('reason', 'reason', None),
+        ('status', 'status', None),
+        ('failure_reason', 'failure_reason', None),
+        ('created_at', 'created_at', as_datetime),
+        ('updated_at', 'updated_at', as_datetime),
+        ('processed_at', 'processed_at', as_datetime),
+    )
+
+
+class MerchantSummarySerializer(serializers.ModelSerializer):
+    """Serializer for one merchant summary bucket"""
+
+    class Meta:
+        model = MerchantSummary
+        fields = ['currency', 'status', 'count', 'total_amount']
+
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    """Serializer for analytics query parameters"""
+
+    granularity = serializers.ChoiceField(choices=TransactionRollup.GRANULARITY_CHOICES, default='hour')
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    currency = serializers.ChoiceField(choices=Transaction.CURRENCY_CHOICES, required=False)
+
+    def validate(self, data):
+        """Default to the last day of hours or the last 30 days"""
+        data.setdefault('end', timezone.now())
+        if 'start' not in data:
+            span = timedelta(days=1) if data['granularity'] == 'hour' else timedelta(days=30)
+            data['start'] = data['end'] - span
+        if data['start'] >= data['end']:
+            raise serializers.ValidationError('start must be earlier than end')
+        return data
+
+
+class TransactionRollupSerializer(serializers.ModelSerializer):
+    """Serializer for one analytics rollup bucket"""
+
+    success_rate = serializers.FloatField(read_only=True)
+    refund_rate = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = TransactionRollup
+        fields = [
+            'bucket_start', 'currency', 'created_count', 'succeeded_count', 'failed_count',
+            'volume', 'success_rate', 'refund_count', 'refund_volume', 'refund_rate'
+        ]
+
+
 class PaymentKeySerializer(serializers.Serializer):
     """Serializer for payment key generation"""
 
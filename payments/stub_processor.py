@@ -0,0 +1,93 @@
+"""
+Local stub payment processor
+
+A small HTTP/1.1 server that answers ``POST /charges`` and ``POST /refunds``
+like the external processor would, with configurable latency and success
+rate. Requests repeating an ``Idempotency-Key`` get the first answer back.
+It is used by the tests and for load runs against ``HTTPGateway``.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubProcessorHandler(BaseHTTPRequestHandler):
+    """Request handler answering charge and refund requests"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connection_count += 1
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+
+        path = self.path.rstrip('/')
+        if path not in ('/charges', '/refunds'):
+            self._respond(404, {'error': 'Not found'})
+            return
+
+        try:
+            request = json.loads(body)
+        except ValueError:
+            self._respond(400, {'error': 'Invalid JSON'})
+            return
+
+        idempotency_key = self.headers.get('Idempotency-Key')
+        if idempotency_key:
+            with self.server.lock:
+                replay = self.server.responses.get((path, idempotency_key))
+            if replay is not None:
+                self._respond(200, replay)
+                return
+
+        time.sleep(random.uniform(self.server.min_delay, self.server.max_delay))
+
+        if path == '/refunds':
+            key, declined = 'refund_id', 'Refund declined by stub processor'
+        else:
+            key, declined = 'transaction_id', 'Payment declined by stub processor'
+        if random.random() < self.server.success_rate:
+            data = {key: request.get(key), 'status': 'succeeded'}
+        else:
+            data = {
+                key: request.get(key),
+                'status': 'failed',
+                'failure_reason': declined
+            }
+
+        if idempotency_key:
+            with self.server.lock:
+                data = self.server.responses.setdefault((path, idempotency_key), data)
+        self._respond(200, data)
+
+    def _respond(self, status_code, data):
+        payload = json.dumps(data).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubProcessorServer(ThreadingHTTPServer):
+    """Threaded stub processor server"""
+
+    daemon_threads = True
+
+    def __init__(self, address, success_rate=1.0, min_delay=0, max_delay=0):
+        super().__init__(address, StubProcessorHandler)
+        self.success_rate = success_rate
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.connection_count = 0
+        # Answers already given, keyed by (path, Idempotency-Key)
+        self.responses = {}
+        self.lock = threading.Lock()
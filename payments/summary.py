@@ -0,0 +1,57 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import F
+from .models import MerchantSummary
+
+
+def increment(model, lookup, deltas):
+    """
+    Add to the counter row matching ``lookup``, creating it on first use
+
+    The increment is a single ``UPDATE ... SET count = count + n``, so
+    concurrent writers never lose updates. A concurrent first insert is
+    resolved by retrying the UPDATE.
+
+    Args:
+        model (Model): Counter model with a unique constraint over ``lookup``
+        lookup (dict): Fields identifying the row
+        deltas (dict): Amounts to add per counter field
+    """
+    row = model.objects.filter(**lookup)
+    update = {field: F(field) + delta for field, delta in deltas.items()}
+
+    if row.update(**update):
+        return
+    try:
+        with db_transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        row.update(**update)
+
+
+def record(kind, rows):
+    """
+    Add settled rows to their merchants' summaries
+
+    Rows are grouped per bucket first, so a batch costs one UPDATE per
+    bucket, and buckets are written in a fixed order to avoid deadlocks
+    between concurrent batches. Call inside the transaction that settles
+    the rows.
+
+    Args:
+        kind (str): 'transaction' or 'refund'
+        rows (iterable): (merchant_id, currency, status, amount) tuples
+    """
+    buckets = defaultdict(lambda: [0, Decimal('0.00')])
+    for merchant_id, currency, status, amount in rows:
+        bucket = buckets[(merchant_id, currency, status)]
+        bucket[0] += 1
+        bucket[1] += amount
+
+    for (merchant_id, currency, status), (count, amount) in sorted(buckets.items()):
+        increment(
+            MerchantSummary,
+            {'merchant_id': merchant_id, 'kind': kind, 'currency': currency, 'status': status},
+            {'count': count, 'total_amount': amount}
+        )
@@ -1,19 +1,176 @@
 import time
-import random
 import logging
+from datetime import timedelta
 from celery import shared_task
 from django.conf import settings
+from django.db import transaction as db_transaction
 from django.utils import timezone
-from .models import Transaction
+from .cache import invalidate, refund_cache_key, transaction_cache_key
+from .gateways import GatewayError, get_gateway
+from .models import Refund, Transaction
+from . import events, outbox, summary
 
 logger = logging.getLogger(__name__)
 
 
+def _apply_outcome(transaction, result, processed_at):
+    """
+    Set the processor outcome on the transaction
+
+    Args:
+        transaction (Transaction): Transaction in the processing state
+        result (ChargeResult): Outcome returned by the gateway
+        processed_at (datetime): Settlement timestamp
+    """
+    if result.success:
+        transaction.status = 'succeeded'
+        transaction.failure_reason = None
+        logger.info(f"Transaction {transaction.payment_key} succeeded")
+    else:
+        transaction.status = 'failed'
+        transaction.failure_reason = result.failure_reason
+        logger.warning(f"Transaction {transaction.payment_key} failed")
+
+    transaction.processed_at = processed_at
+    transaction.updated_at = processed_at
+
+
+def _save_settlement(transactions):
+    """
+    Persist settled transactions and queue their webhooks atomically
+
+    Outcomes are written with compare-and-set transitions out of
+    processing, one UPDATE per distinct outcome. Only the transactions whose
+    transition won get a webhook.
+
+    Args:
+        transactions (list): Transactions with their outcome applied
+
+    Returns:
+        list: Transactions whose settlement was saved
+    """
+    from webhooks.tasks import send_webhook_notification
+
+    groups = {}
+    for transaction in transactions:
+        key = (transaction.status, transaction.failure_reason, transaction.processed_at)
+        groups.setdefault(key, []).append(transaction)
+
+    settled = []
+    with db_transaction.atomic():
+        for (status, failure_reason, processed_at), group in groups.items():
+            group_ids = [transaction.id for transaction in group]
+            updated = Transaction.objects.filter(id__in=group_ids).transition(
+                status,
+                failure_reason=failure_reason,
+                processed_at=processed_at,
+                updated_at=processed_at
+            )
+            if updated < len(group):
+                # Some rows were settled or re-driven concurrently; keep only
+                # the ones carrying this settlement's timestamp
+                won = set(
+                    Transaction.objects.filter(
+                        id__in=group_ids, status=status, processed_at=processed_at
+                    ).values_list('id', flat=True)
+                )
+                group = [transaction for transaction in group if transaction.id in won]
+            settled.extend(group)
+
+        outbox.enqueue_many(send_webhook_notification, [
+            (str(transaction.id), f'transaction.{transaction.status}')
+            for transaction in settled
+        ])
+        summary.record('transaction', (
+            (transaction.merchant_id, transaction.currency, transaction.status, transaction.amount)
+            for transaction in settled
+        ))
+        invalidate(*(
+            transaction_cache_key(transaction.merchant_id, transaction.id)
+            for transaction in settled
+        ))
+        events.publish(
+            events.status_event(
+                transaction.id, transaction.status, transaction.failure_reason, transaction.processed_at
+            )
+            for transaction in settled
+        )
+
+    return settled
+
+
+def _skipped(transaction_id):
+    """Result returned when a task lost its status transition"""
+    return {'status': 'skipped', 'transaction_id': str(transaction_id)}
+
+
+def _finalize_transaction(transaction):
+    """
+    Settle a processing transaction and dispatch its webhook
+
+    Args:
+        transaction (Transaction): Transaction in the processing state
+
+    Returns:
+        dict: Processing result with status and transaction ID
+    """
+    result = get_gateway().charge(transaction)
+    _apply_outcome(transaction, result, timezone.now())
+
+    # Save the outcome and queue the webhook notification together
+    if not _save_settlement([transaction]):
+        logger.info(f"Transaction {transaction.payment_key} was settled concurrently")
+        return _skipped(transaction.id)
+
+    return {
+        'status': transaction.status,
+        'transaction_id': str(transaction.id),
+        'payment_key': transaction.payment_key
+    }
+
+
+def claim_pending_transactions(limit):
+    """
+    Claim up to ``limit`` pending transactions for the calling worker
+
+    Rows are locked with ``SELECT ... FOR UPDATE SKIP LOCKED`` and moved to
+    processing in a single UPDATE, so concurrent workers never claim the
+    same transaction.
+
+    Args:
+        limit (int): Maximum number of transactions to claim
+
+    Returns:
+        list: UUIDs of the claimed transactions
+    """
+    with db_transaction.atomic():
+        transaction_ids = list(
+            Transaction.objects.select_for_update(skip_locked=True)
+            .filter(status='pending')
+            .order_by('created_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        if transaction_ids:
+            Transaction.objects.filter(id__in=transaction_ids).transition('processing')
+            events.publish(
+                events.status_event(transaction_id, 'processing') for transaction_id in transaction_ids
+            )
+
+    return transaction_ids
+
+
 @shared_task(bind=True, max_retries=3)
 def process_transaction(self, transaction_id):
     """
     Process a transaction asynchronously with simulated delay
 
+    The transaction is claimed with a compare-and-set transition from
+    pending to processing, so duplicate or re-driven messages are no-ops.
+    Retries of this task resume the row it already claimed.
+    In ``deferred`` mode ``complete_transaction`` is then scheduled with the
+    simulated delay as its countdown, so the worker slot is released
+    immediately. In ``blocking`` mode the delay is slept inside this task.
+
     Args:
         transaction_id (str): UUID of the transaction to process
 
@@ -21,52 +178,373 @@ def process_transaction(self, transaction_id):
         dict: Processing result with status and transaction ID
     """
     try:
-        # Get the transaction
-        transaction = Transaction.objects.get(id=transaction_id)
+        if Transaction.objects.filter(id=transaction_id).transition('processing'):
+            events.publish([events.status_event(transaction_id, 'processing')])
+        elif not (
+            # A retry finds the row still in processing from its own first claim
+            self.request.retries
+            and Transaction.objects.filter(id=transaction_id, status='processing').exists()
+        ):
+            logger.info(f"Skipping transaction {transaction_id}: not pending")
+            return _skipped(transaction_id)
 
-        # Update status to processing
-        transaction.status = 'processing'
-        transaction.save(update_fields=['status', 'updated_at'])
+        logger.info(f"Processing transaction {transaction_id}")
 
-        logger.info(f"Processing transaction {transaction.payment_key}")
+        # Simulated processor latency (3-5 seconds with the simulated gateway)
+        delay = get_gateway().latency()
+
+        if settings.TRANSACTION_PROCESSING_MODE == 'deferred':
+            complete_transaction.apply_async(args=[str(transaction_id)], countdown=delay)
+            return {
+                'status': 'processing',
+                'transaction_id': str(transaction_id)
+            }
 
-        # Simulate processing delay (3-5 seconds)
-        delay = random.uniform(
-            settings.TRANSACTION_PROCESSING_MIN_DELAY,
-            settings.TRANSACTION_PROCESSING_MAX_DELAY
-        )
         time.sleep(delay)
+        return _finalize_transaction(Transaction.objects.get(id=transaction_id))
+
+    except Exception as exc:
+        logger.error(f"Error processing transaction {transaction_id}: {str(exc)}")
+        # Retry the task
+        raise self.retry(exc=exc, countdown=60)
+
+
+@shared_task(bind=True, max_retries=3)
+def complete_transaction(self, transaction_id):
+    """
+    Settle a transaction once its simulated processing delay has elapsed
 
-        # Determine success based on configured rate
-        success = random.random() < settings.TRANSACTION_SUCCESS_RATE
+    A redelivered message finds the row still in processing until the first
+    delivery has settled it and charges again; the gateway sends a stable
+    idempotency key per transaction, so the processor answers it with the
+    first charge's outcome instead of charging twice.
 
-        if success:
-            transaction.status = 'succeeded'
-            transaction.failure_reason = None
-            logger.info(f"Transaction {transaction.payment_key} succeeded")
-        else:
-            transaction.status = 'failed'
-            transaction.failure_reason = 'Payment processing failed (simulated failure)'
-            logger.warning(f"Transaction {transaction.payment_key} failed")
+    Args:
+        transaction_id (str): UUID of the transaction to settle
 
-        transaction.processed_at = timezone.now()
-        transaction.save(update_fields=['status', 'failure_reason', 'processed_at', 'updated_at'])
+    Returns:
+        dict: Processing result with status and transaction ID
+    """
+    try:
+        transaction = Transaction.objects.get(id=transaction_id)
 
-        # Trigger webhook notification
-        from webhooks.tasks import send_webhook_notification
-        send_webhook_notification.delay(transaction_id, f'transaction.{transaction.status}')
+        # Ignore duplicate deliveries once the transaction has been settled
+        if transaction.status != 'processing':
+            logger.info(
+                f"Skipping completion of transaction {transaction.payment_key} "
+                f"in status {transaction.status}"
+            )
+            return _skipped(transaction_id)
 
-        return {
-            'status': transaction.status,
-            'transaction_id': str(transaction_id),
-            'payment_key': transaction.payment_key
-        }
+        return _finalize_transaction(transaction)
 
     except Transaction.DoesNotExist:
         logger.error(f"Transaction {transaction_id} not found")
         raise
 
     except Exception as exc:
-        logger.error(f"Error processing transaction {transaction_id}: {str(exc)}")
-        # Retry the task
+        logger.error(f"Error completing transaction {transaction_id}: {str(exc)}")
         raise self.retry(exc=exc, countdown=60)
+
+
+def _save_refund_settlement(refund):
+    """
+    Persist a refund outcome and queue its webhook atomically
+
+    A failed refund gives its amount back to the transaction's refunded
+    total, so it can be refunded again.
+
+    Args:
+        refund (Refund): Refund with its outcome applied
+
+    Returns:
+        bool: True if this call settled the refund
+    """
+    from webhooks.tasks import send_refund_webhook_notification
+
+    transaction = refund.transaction
+    with db_transaction.atomic():
+        settled = Refund.objects.filter(id=refund.id).transition(
+            refund.status,
+            failure_reason=refund.failure_reason,
+            processed_at=refund.processed_at,
+            updated_at=refund.processed_at
+        )
+        if not settled:
+            return False
+
+        cache_keys = [refund_cache_key(transaction.merchant_id, refund.id)]
+        if refund.status == 'failed':
+            Transaction.objects.filter(id=transaction.id).release_refund(refund.amount)
+            cache_keys.append(transaction_cache_key(transaction.merchant_id, transaction.id))
+
+        outbox.enqueue(send_refund_webhook_notification, str(refund.id), f'refund.{refund.status}')
+        summary.record('refund', [
+            (transaction.merchant_id, transaction.currency, refund.status, refund.amount)
+        ])
+        invalidate(*cache_keys)
+
+    return True
+
+
+@shared_task(bind=True, max_retries=3)
+def process_refund(self, refund_id):
+    """
+    Schedule the settlement of a pending refund
+
+    ``complete_refund`` is scheduled with the simulated processor latency
+    as its countdown, so the worker slot is released immediately. Duplicate
+    messages only schedule extra completions, which lose the claim there.
+
+    Args:
+        refund_id (str): UUID of the refund to process
+
+    Returns:
+        dict: Processing result with status and refund ID
+    """
+    try:
+        if not Refund.objects.filter(id=refund_id, status='pending').exists():
+            logger.info(f"Skipping refund {refund_id}: not pending")
+            return {'status': 'skipped', 'refund_id': str(refund_id)}
+
+        complete_refund.apply_async(args=[str(refund_id)], countdown=get_gateway().latency())
+        return {'status': 'pending', 'refund_id': str(refund_id)}
+
+    except Exception as exc:
+        logger.error(f"Error processing refund {refund_id}: {str(exc)}")
+        raise self.retry(exc=exc, countdown=60)
+
+
+@shared_task(bind=True, max_retries=3)
+def complete_refund(self, refund_id):
+    """
+    Send a pending refund to the processor and settle it
+
+    The refund is claimed with a compare-and-set transition from pending to
+    processing right before the processor is called, so duplicate or
+    redelivered messages never send it twice. Retries of this task resume
+    the row it already claimed.
+
+    Args:
+        refund_id (str): UUID of the refund to settle
+
+    Returns:
+        dict: Processing result with status and refund ID
+    """
+    try:
+        if not Refund.objects.filter(id=refund_id).transition('processing') and not (
+            self.request.retries
+            and Refund.objects.filter(id=refund_id, status='processing').exists()
+        ):
+            logger.info(f"Skipping completion of refund {refund_id}: not pending")
+            return {'status': 'skipped', 'refund_id': str(refund_id)}
+
+        refund = Refund.objects.select_related('transaction').get(id=refund_id)
+        result = get_gateway().refund(refund)
+        refund.status = 'succeeded' if result.success else 'failed'
+        refund.failure_reason = result.failure_reason
+        refund.processed_at = timezone.now()
+
+        if not _save_refund_settlement(refund):
+            logger.info(f"Refund {refund_id} was settled concurrently")
+            return {'status': 'skipped', 'refund_id': str(refund_id)}
+
+        logger.info(f"Refund {refund_id} {refund.status}")
+        return {'status': refund.status, 'refund_id': str(refund_id)}
+
+    except Refund.DoesNotExist:
+        logger.error(f"Refund {refund_id} not found")
+        raise
+
+    except Exception as exc:
+        logger.error(f"Error completing refund {refund_id}: {str(exc)}")
+        raise self.retry(exc=exc, countdown=60)
+
+
+@shared_task
+def process_pending_batch(batch_size=None):
+    """
+    Claim a batch of pending transactions and schedule their settlement
+
+    Re-enqueues itself while full batches are being claimed, so a backlog is
+    drained continuously by as many workers as are available.
+
+    Args:
+        batch_size (int): Maximum number of transactions to claim
+
+    Returns:
+        dict: Number of claimed transactions
+    """
+    batch_size = batch_size or settings.TRANSACTION_BATCH_SIZE
+    transaction_ids = claim_pending_transactions(batch_size)
+
+    if not transaction_ids:
+        return {'claimed': 0}
+
+    logger.info(f"Claimed {len(transaction_ids)} pending transactions")
+
+    settle_transaction_batch.apply_async(
+        args=[[str(transaction_id) for transaction_id in transaction_ids]],
+        countdown=get_gateway().latency()
+    )
+
+    # Keep draining while the backlog fills whole batches
+    if len(transaction_ids) == batch_size:
+        process_pending_batch.delay(batch_size)
+
+    return {'claimed': len(transaction_ids)}
+
+
+@shared_task(bind=True, max_retries=3)
+def settle_transaction_batch(self, transaction_ids):
+    """
+    Settle a batch of claimed transactions with a single bulk update
+
+    Args:
+        transaction_ids (list): UUIDs of transactions claimed by the batch
+
+    Returns:
+        dict: Number of settled transactions per status
+    """
+    try:
+        transactions = list(
+            Transaction.objects.filter(id__in=transaction_ids, status='processing')
+        )
+
+        gateway = get_gateway()
+        charged = []
+        for transaction in transactions:
+            try:
+                charged.append((transaction, gateway.charge(transaction)))
+            except GatewayError as exc:
+                # Left in processing for a later re-drive
+                logger.error(f"Error charging transaction {transaction.payment_key}: {str(exc)}")
+
+        # Stamped once every charge has returned, right before the commit, so
+        # the rollup watermark on processed_at never passes rows still unsaved
+        processed_at = timezone.now()
+        transactions = []
+        for transaction, result in charged:
+            _apply_outcome(transaction, result, processed_at)
+            transactions.append(transaction)
+
+        results = {'succeeded': 0, 'failed': 0}
+        for transaction in _save_settlement(transactions):
+            results[transaction.status] += 1
+
+        return results
+
+    except Exception as exc:
+        logger.error(f"Error settling transaction batch: {str(exc)}")
+        raise self.retry(exc=exc, countdown=60)
+
+
+@shared_task
+def reconcile_stuck_transactions(limit=None):
+    """
+    Re-drive transactions stuck in pending or processing
+
+    Picks up rows whose worker died mid-flight or whose message was lost.
+    Processing rows are reset to pending and, in the per-transaction
+    processing modes, ``process_transaction`` is queued again; the claim in
+    ``process_transaction`` makes the re-drive idempotent. The scan is served
+    by the partial in-flight index.
+
+    Args:
+        limit (int): Maximum number of transactions to re-drive
+
+    Returns:
+        dict: Number of re-driven transactions
+    """
+    limit = limit or settings.TRANSACTION_RECONCILE_BATCH_SIZE
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=settings.TRANSACTION_STUCK_THRESHOLD_SECONDS)
+
+    with db_transaction.atomic():
+        transaction_ids = list(
+            Transaction.objects.select_for_update(skip_locked=True)
+            .filter(status__in=['pending', 'processing'], updated_at__lt=cutoff)
+            .order_by('updated_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not transaction_ids:
+            return {'redriven': 0}
+
+        Transaction.objects.filter(id__in=transaction_ids, status='pending').update(updated_at=now)
+        Transaction.objects.filter(id__in=transaction_ids).transition('pending', updated_at=now)
+
+        if settings.TRANSACTION_PROCESSING_MODE in ('blocking', 'deferred'):
+            outbox.enqueue_many(process_transaction, [
+                (str(transaction_id),) for transaction_id in transaction_ids
+            ])
+
+    logger.warning(f"Re-driving {len(transaction_ids)} stuck transactions")
+    return {'redriven': len(transaction_ids)}
+
+
+@shared_task
+def reconcile_stuck_refunds(limit=None):
+    """
+    Re-drive refunds stuck in pending or processing
+
+    Works like ``reconcile_stuck_transactions``: processing rows are reset to
+    pending and ``process_refund`` is queued again; the claim in
+    ``complete_refund`` makes the re-drive idempotent.
+
+    Args:
+        limit (int): Maximum number of refunds to re-drive
+
+    Returns:
+        dict: Number of re-driven refunds
+    """
+    limit = limit or settings.TRANSACTION_RECONCILE_BATCH_SIZE
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=settings.TRANSACTION_STUCK_THRESHOLD_SECONDS)
+
+    with db_transaction.atomic():
+        refund_ids = list(
+            Refund.objects.select_for_update(skip_locked=True)
+            .filter(status__in=['pending', 'processing'], updated_at__lt=cutoff)
+            .order_by('updated_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not refund_ids:
+            return {'redriven': 0}
+
+        Refund.objects.filter(id__in=refund_ids, status='pending').update(updated_at=now)
+        Refund.objects.filter(id__in=refund_ids).transition('pending', updated_at=now)
+        outbox.enqueue_many(process_refund, [(str(refund_id),) for refund_id in refund_ids])
+
+    logger.warning(f"Re-driving {len(refund_ids)} stuck refunds")
+    return {'redriven': len(refund_ids)}
+
+
+@shared_task
+def build_analytics_rollups():
+    """
+    Fold transactions and refunds settled since the last run into the rollups
+
+    Returns:
+        dict: Hourly groups folded per source
+    """
+    from .rollups import build_rollups
+    return build_rollups()
+
+
+@shared_task
+def maintain_partitions():
+    """
+    Keep upcoming monthly partitions ready and archive expired ones
+
+    Returns:
+        dict: Archived partition names per table
+    """
+    from payment_api.partitioning import archive_partitions, ensure_partitions
+
+    archived = {}
+    for table, retention_months in settings.PARTITION_RETENTION_MONTHS.items():
+        ensure_partitions(table, settings.PARTITION_MONTHS_AHEAD)
+        archived[table] = archive_partitions(
+            table, retention_months, settings.PARTITION_ARCHIVE_SCHEMA
+        )
+    return {'archived': archived}
@@ -1,11 +1,17 @@
-from django.test import TestCase
+import uuid
+import asyncio
+from django.conf import settings
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from authentication.models import Merchant
-from payments.models import Transaction, Refund
+from payments.models import Transaction, Refund, OutboxMessage
+from datetime import timedelta
 from decimal import Decimal
+from unittest.mock import patch
 
 
 class TransactionModelTest(TestCase):
@@ -72,6 +78,26 @@ class RefundModelTest(TestCase):
         self.assertEqual(refund.reason, 'Customer request')
         self.assertEqual(refund.status, 'pending')
 
+    def test_reserve_refund_stops_at_amount(self):
+        """Test partial refunds add up to at most the transaction amount"""
+        queryset = Transaction.objects.filter(id=self.transaction.id)
+
+        self.assertEqual(queryset.reserve_refund(Decimal('60.00')), 1)
+        self.assertEqual(queryset.reserve_refund(Decimal('40.01')), 0)
+        self.assertEqual(queryset.reserve_refund(Decimal('40.00')), 1)
+
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.refunded_amount, Decimal('100.00'))
+        self.assertFalse(self.transaction.is_refundable)
+
+    def test_reserve_refund_requires_succeeded(self):
+        """Test only succeeded transactions can be refunded"""
+        Transaction.objects.filter(id=self.transaction.id).update(status='failed')
+
+        self.assertEqual(
+            Transaction.objects.filter(id=self.transaction.id).reserve_refund(Decimal('1.00')), 0
+        )
+
 
 class TransactionAPITest(APITestCase):
     """Test cases for Transaction API endpoints"""
@@ -100,6 +126,11 @@ class TransactionAPITest(APITestCase):
         self.assertEqual(response.data['data']['status'], 'pending')
         self.assertIsNotNone(response.data['data']['payment_key'])
 
+        # Processing is queued through the outbox, not published inline
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.task_name, 'payments.tasks.process_transaction')
+        self.assertEqual(message.args, [response.data['data']['id']])
+
     def test_create_transaction_invalid_amount(self):
         """Test creating transaction with invalid amount fails"""
         url = reverse('payments:create-transaction')
@@ -216,6 +247,27 @@ class RefundAPITest(APITestCase):
         self.assertEqual(response.data['data']['amount'], '50.00')
         self.assertEqual(response.data['data']['reason'], 'Customer request')
 
+    def test_list_refunds(self):
+        """Test listing returns only the merchant's refunds, newest first"""
+        first = Refund.objects.create(transaction=self.transaction, amount=Decimal('10.00'), reason='First')
+        second = Refund.objects.create(transaction=self.transaction, amount=Decimal('20.00'), reason='Second')
+        other = Merchant.objects.create_user(email='other@example.com', password='pass123')
+        Refund.objects.create(
+            transaction=Transaction.objects.create(
+                merchant=other, amount=Decimal('10.00'), currency='USD', status='succeeded'
+            ),
+            amount=Decimal('5.00'),
+            reason='Other'
+        )
+
+        response = self.client.get(reverse('refunds:list-refunds'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        rows = response.data['results']['data']
+        self.assertEqual([row['id'] for row in rows], [str(second.id), str(first.id)])
+        self.assertEqual(rows[0]['transaction_payment_key'], self.transaction.payment_key)
+
     def test_create_refund_exceeds_amount(self):
         """Test creating refund that exceeds transaction amount fails"""
         url = reverse('refunds:create-refund')
@@ -249,16 +301,25 @@ class RefundAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertFalse(response.data['success'])
 
-    def test_create_duplicate_refund(self):
-        """Test creating duplicate refund for same transaction fails"""
-        # Create first refund
-        Refund.objects.create(
-            transaction=self.transaction,
-            amount=Decimal('50.00'),
-            reason='First refund'
-        )
+    def test_create_partial_refunds(self):
+        """Test several partial refunds of one transaction are allowed"""
+        url = reverse('refunds:create-refund')
+        for amount in ('60.00', '40.00'):
+            response = self.client.post(url, {
+                'transaction': str(self.transaction.id),
+                'amount': amount,
+                'reason': 'Partial refund'
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.refunds.count(), 2)
+        self.assertEqual(self.transaction.refunded_amount, Decimal('100.00'))
+
+    def test_create_refund_exceeds_refundable_amount(self):
+        """Test refunds cannot exceed what is left to refund"""
+        Transaction.objects.filter(id=self.transaction.id).reserve_refund(Decimal('80.00'))
 
-        # Try to create second refund
         url = reverse('refunds:create-refund')
         data = {
             'transaction': str(self.transaction.id),
@@ -270,6 +331,24 @@ class RefundAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertFalse(response.data['success'])
 
+    def test_create_refund_loses_race(self):
+        """Test a refund validated against a stale total is rejected by the ledger update"""
+        stale = Transaction.objects.get(id=self.transaction.id)
+        Transaction.objects.filter(id=self.transaction.id).reserve_refund(Decimal('80.00'))
+
+        with patch('payments.serializers.RefundSerializer.validate', side_effect=lambda data: data):
+            with patch('rest_framework.relations.PrimaryKeyRelatedField.to_internal_value', return_value=stale):
+                response = self.client.post(reverse('refunds:create-refund'), {
+                    'transaction': str(self.transaction.id),
+                    'amount': '25.00',
+                    'reason': 'Concurrent refund'
+                }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Refund.objects.exists())
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.refunded_amount, Decimal('80.00'))
+
     def test_get_refund(self):
         """Test getting a single refund"""
         refund = Refund.objects.create(
@@ -285,3 +364,2014 @@ class RefundAPITest(APITestCase):
         self.assertTrue(response.data['success'])
         self.assertEqual(response.data['data']['amount'], '75.00')
         self.assertEqual(response.data['data']['reason'], 'Customer request')
+
+
+class TransactionProcessingTest(TestCase):
+    """Test cases for transaction processing tasks"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.transaction = Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('100.00'),
+            currency='USD'
+        )
+
+    @override_settings(TRANSACTION_PROCESSING_MODE='deferred')
+    @patch('payments.tasks.complete_transaction.apply_async')
+    def test_deferred_processing_schedules_completion(self, mock_apply_async):
+        """Test deferred mode marks processing and schedules completion"""
+        from payments.tasks import process_transaction
+        process_transaction(str(self.transaction.id))
+
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.status, 'processing')
+        mock_apply_async.assert_called_once()
+        _, kwargs = mock_apply_async.call_args
+        self.assertEqual(kwargs['args'], [str(self.transaction.id)])
+        self.assertGreaterEqual(kwargs['countdown'], settings.TRANSACTION_PROCESSING_MIN_DELAY)
+        self.assertLessEqual(kwargs['countdown'], settings.TRANSACTION_PROCESSING_MAX_DELAY)
+
+    @override_settings(TRANSACTION_PROCESSING_MODE='deferred')
+    @patch('payments.tasks.complete_transaction.apply_async')
+    def test_retry_resumes_claimed_transaction(self, mock_apply_async):
+        """Test a retry picks up the row its first attempt already claimed"""
+        from payments.tasks import process_transaction
+        self.transaction.status = 'processing'
+        self.transaction.save()
+
+        result = process_transaction.apply(args=[str(self.transaction.id)], retries=1).get()
+
+        self.assertEqual(result['status'], 'processing')
+        mock_apply_async.assert_called_once()
+
+    @override_settings(TRANSACTION_SUCCESS_RATE=1.0)
+    def test_complete_transaction_settles(self):
+        """Test completion settles the transaction and queues the webhook"""
+        self.transaction.status = 'processing'
+        self.transaction.save()
+
+        from payments.tasks import complete_transaction
+        result = complete_transaction(str(self.transaction.id))
+
+        self.transaction.refresh_from_db()
+        self.assertEqual(result['status'], 'succeeded')
+        self.assertEqual(self.transaction.status, 'succeeded')
+        self.assertIsNotNone(self.transaction.processed_at)
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.task_name, 'webhooks.tasks.send_webhook_notification')
+        self.assertEqual(message.args, [str(self.transaction.id), 'transaction.succeeded'])
+
+    def test_complete_transaction_ignores_settled(self):
+        """Test duplicate completion does not overwrite a settled transaction"""
+        self.transaction.status = 'failed'
+        self.transaction.save()
+
+        from payments.tasks import complete_transaction
+        complete_transaction(str(self.transaction.id))
+
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.status, 'failed')
+        self.assertFalse(OutboxMessage.objects.exists())
+
+
+class BatchProcessingTest(TestCase):
+    """Test cases for the batch transaction processor"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.transactions = [
+            Transaction.objects.create(
+                merchant=self.merchant,
+                amount=Decimal('10.00'),
+                currency='USD'
+            )
+            for _ in range(3)
+        ]
+
+    def test_claim_pending_transactions(self):
+        """Test claiming moves a limited batch to processing exactly once"""
+        from payments.tasks import claim_pending_transactions
+
+        first = claim_pending_transactions(2)
+        second = claim_pending_transactions(2)
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse(set(first) & set(second))
+        self.assertEqual(Transaction.objects.filter(status='processing').count(), 3)
+        self.assertEqual(claim_pending_transactions(2), [])
+
+    @patch('payments.tasks.process_pending_batch.delay')
+    @patch('payments.tasks.settle_transaction_batch.apply_async')
+    def test_process_pending_batch_drains_backlog(self, mock_apply_async, mock_delay):
+        """Test a full batch schedules settlement and re-enqueues the processor"""
+        from payments.tasks import process_pending_batch
+        result = process_pending_batch(3)
+
+        self.assertEqual(result['claimed'], 3)
+        mock_apply_async.assert_called_once()
+        self.assertEqual(len(mock_apply_async.call_args.kwargs['args'][0]), 3)
+        mock_delay.assert_called_once_with(3)
+
+    @override_settings(TRANSACTION_SUCCESS_RATE=0.0)
+    def test_settle_transaction_batch(self):
+        """Test settling a claimed batch updates every row and sends webhooks"""
+        from payments.tasks import claim_pending_transactions, settle_transaction_batch
+        transaction_ids = [str(transaction_id) for transaction_id in claim_pending_transactions(10)]
+
+        result = settle_transaction_batch(transaction_ids)
+
+        self.assertEqual(result, {'succeeded': 0, 'failed': 3})
+        self.assertEqual(Transaction.objects.filter(status='failed').count(), 3)
+        self.assertFalse(Transaction.objects.filter(processed_at__isnull=True).exists())
+        self.assertEqual(OutboxMessage.objects.count(), 3)
+
+    def test_settle_transaction_batch_stamps_after_charges(self):
+        """Test processed_at is taken once the last charge has returned"""
+        from payments.gateways import ChargeResult
+        from payments.tasks import claim_pending_transactions, settle_transaction_batch
+        transaction_ids = [str(transaction_id) for transaction_id in claim_pending_transactions(10)]
+        charged_at = []
+
+        def charge(transaction):
+            charged_at.append(timezone.now())
+            return ChargeResult(success=True, failure_reason=None)
+
+        with patch('payments.tasks.get_gateway') as mock_gateway:
+            mock_gateway.return_value.charge.side_effect = charge
+            settle_transaction_batch(transaction_ids)
+
+        processed_at = set(Transaction.objects.values_list('processed_at', flat=True))
+        self.assertEqual(len(processed_at), 1)
+        self.assertGreaterEqual(processed_at.pop(), max(charged_at))
+
+
+@override_settings(
+    TRANSACTION_PROCESSING_MIN_DELAY=0,
+    TRANSACTION_PROCESSING_MAX_DELAY=0,
+    TRANSACTION_SUCCESS_RATE=1.0
+)
+class AsyncEngineTest(TestCase):
+    """Test cases for the asyncio transaction engine"""
+
+    def setUp(self):
+        # Would drop the test case's connection, which sits inside a transaction
+        patcher = patch('payments.async_engine.close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        for _ in range(3):
+            Transaction.objects.create(
+                merchant=self.merchant,
+                amount=Decimal('10.00'),
+                currency='USD'
+            )
+
+    async def test_run_claims_up_to_concurrency(self):
+        """Test the engine claims no more than its free slots and settles them"""
+        from payments import async_engine
+
+        stop_event = asyncio.Event()
+        claim = async_engine.claim_pending_transactions
+
+        def claim_once(limit):
+            stop_event.set()
+            return claim(limit)
+
+        with patch('payments.async_engine.claim_pending_transactions', side_effect=claim_once):
+            await async_engine.run(max_concurrency=2, poll_interval=0.01, stop_event=stop_event)
+
+        self.assertEqual(await Transaction.objects.filter(status='succeeded').acount(), 2)
+        self.assertEqual(await Transaction.objects.filter(status='pending').acount(), 1)
+        self.assertEqual(await OutboxMessage.objects.acount(), 2)
+
+    async def test_run_survives_claim_error(self):
+        """Test a failing claim is logged and the engine keeps claiming"""
+        from django.db import OperationalError
+        from payments import async_engine
+
+        stop_event = asyncio.Event()
+        claim = async_engine.claim_pending_transactions
+        calls = []
+
+        def flaky_claim(limit):
+            calls.append(limit)
+            if len(calls) == 1:
+                raise OperationalError('server closed the connection unexpectedly')
+            stop_event.set()
+            return claim(limit)
+
+        with patch('payments.async_engine.claim_pending_transactions', side_effect=flaky_claim):
+            await async_engine.run(max_concurrency=5, poll_interval=0.01, stop_event=stop_event)
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(await Transaction.objects.filter(status='succeeded').acount(), 3)
+
+    async def test_run_refills_freed_slots(self):
+        """Test a full engine claims again when a settlement finishes, not after the poll interval"""
+        from payments import async_engine
+
+        stop_event = asyncio.Event()
+        claim = async_engine.claim_pending_transactions
+
+        def claim_until_drained(limit):
+            transaction_ids = claim(limit)
+            if not transaction_ids:
+                stop_event.set()
+            return transaction_ids
+
+        with patch('payments.async_engine.claim_pending_transactions', side_effect=claim_until_drained):
+            await asyncio.wait_for(
+                async_engine.run(max_concurrency=1, poll_interval=30, stop_event=stop_event),
+                timeout=10
+            )
+
+        self.assertEqual(await Transaction.objects.filter(status='succeeded').acount(), 3)
+
+    async def test_settle_transaction_skips_settled(self):
+        """Test settlement leaves transactions outside processing untouched"""
+        from payments.async_engine import settle_transaction
+
+        transaction = await Transaction.objects.afirst()
+        result = await settle_transaction(str(transaction.id), asyncio.Semaphore(1))
+
+        self.assertIsNone(result)
+        self.assertFalse(await OutboxMessage.objects.aexists())
+
+
+class PaymentGatewayTest(TestCase):
+    """Test cases for payment processor gateways"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.transaction = Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('100.00'),
+            currency='USD'
+        )
+
+    def _start_stub_processor(self, success_rate):
+        import threading
+        from payments.stub_processor import StubProcessorServer
+
+        server = StubProcessorServer(('127.0.0.1', 0), success_rate=success_rate)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    @override_settings(TRANSACTION_SUCCESS_RATE=0.0)
+    def test_simulated_gateway_failure(self):
+        """Test the simulated gateway follows the configured success rate"""
+        from payments.gateways import SimulatedGateway
+        result = SimulatedGateway().charge(self.transaction)
+
+        self.assertFalse(result.success)
+        self.assertEqual(result.failure_reason, 'Payment processing failed (simulated failure)')
+
+    def test_http_gateway_reuses_connection(self):
+        """Test the HTTP gateway charges over one pooled keep-alive connection"""
+        from payments.gateways import HTTPGateway
+        server = self._start_stub_processor(success_rate=1.0)
+        gateway = HTTPGateway(base_url=f'http://127.0.0.1:{server.server_address[1]}')
+
+        results = [gateway.charge(self.transaction) for _ in range(3)]
+
+        self.assertTrue(all(result.success for result in results))
+        self.assertEqual(server.connection_count, 1)
+
+    def test_http_gateway_decline(self):
+        """Test a processor decline is returned as a failed charge"""
+        from payments.gateways import HTTPGateway
+        server = self._start_stub_processor(success_rate=0.0)
+        gateway = HTTPGateway(base_url=f'http://127.0.0.1:{server.server_address[1]}')
+
+        result = gateway.charge(self.transaction)
+
+        self.assertFalse(result.success)
+        self.assertEqual(result.failure_reason, 'Payment declined by stub processor')
+
+    def test_http_gateway_replays_repeated_charge(self):
+        """Test a repeated charge carries the same idempotency key and gets the first answer"""
+        from payments.gateways import HTTPGateway
+        server = self._start_stub_processor(success_rate=1.0)
+        gateway = HTTPGateway(base_url=f'http://127.0.0.1:{server.server_address[1]}')
+
+        first = gateway.charge(self.transaction)
+        server.success_rate = 0.0
+        second = gateway.charge(self.transaction)
+
+        self.assertTrue(first.success)
+        self.assertEqual(second, first)
+        self.assertEqual(list(server.responses), [('/charges', f'charge-{self.transaction.id}')])
+
+    @override_settings(PAYMENT_GATEWAY_POOL_SIZE=2, TRANSACTION_ASYNC_MAX_CONCURRENCY=10)
+    async def test_http_gateway_acharge_not_capped_by_sync_pool(self):
+        """Test async charges run concurrently beyond the blocking session's pool"""
+        from payments.gateways import HTTPGateway
+        server = self._start_stub_processor(success_rate=1.0)
+        server.min_delay = server.max_delay = 0.2
+        gateway = HTTPGateway(base_url=f'http://127.0.0.1:{server.server_address[1]}')
+        transactions = [
+            await Transaction.objects.acreate(
+                merchant=self.merchant, amount=Decimal('1.00'), currency='USD', payment_key=f'key-{index}'
+            )
+            for index in range(10)
+        ]
+
+        results = await asyncio.gather(*(gateway.acharge(transaction) for transaction in transactions))
+        await gateway.aclose()
+
+        self.assertTrue(all(result.success for result in results))
+        self.assertEqual(server.connection_count, 10)
+
+    def test_http_gateway_refund(self):
+        """Test the HTTP gateway sends refunds to the processor"""
+        from payments.gateways import HTTPGateway
+        server = self._start_stub_processor(success_rate=0.0)
+        gateway = HTTPGateway(base_url=f'http://127.0.0.1:{server.server_address[1]}')
+        refund = Refund(transaction=self.transaction, amount=Decimal('10.00'))
+
+        result = gateway.refund(refund)
+
+        self.assertFalse(result.success)
+        self.assertEqual(result.failure_reason, 'Refund declined by stub processor')
+
+    def test_http_gateway_unreachable(self):
+        """Test connection failures raise GatewayError"""
+        from payments.gateways import GatewayError, HTTPGateway
+        server = self._start_stub_processor(success_rate=1.0)
+        port = server.server_address[1]
+        server.shutdown()
+        server.server_close()
+        gateway = HTTPGateway(base_url=f'http://127.0.0.1:{port}', connect_timeout=1)
+
+        with self.assertRaises(GatewayError):
+            gateway.charge(self.transaction)
+
+
+class RefundProcessingTest(APITestCase):
+    """Test cases for the asynchronous refund pipeline"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.token = Token.objects.create(user=self.merchant)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.transaction = Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('100.00'),
+            currency='USD',
+            status='succeeded'
+        )
+
+    def _create_refund(self, amount='40.00'):
+        response = self.client.post(reverse('refunds:create-refund'), {
+            'transaction': str(self.transaction.id),
+            'amount': amount,
+            'reason': 'Customer request'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Refund.objects.get(id=response.data['data']['id'])
+
+    def test_create_refund_enqueues_pipeline(self):
+        """Test creating a refund only inserts it and queues processing and refund.created"""
+        refund = self._create_refund()
+
+        self.assertEqual(refund.status, 'pending')
+        self.assertEqual(
+            list(OutboxMessage.objects.values_list('task_name', 'args')),
+            [
+                ('payments.tasks.process_refund', [str(refund.id)]),
+                ('webhooks.tasks.send_refund_webhook_notification', [str(refund.id), 'refund.created']),
+            ]
+        )
+
+    def test_process_refund_defers_completion(self):
+        """Test processing schedules the completion after the simulated latency"""
+        from payments.tasks import process_refund
+        refund = self._create_refund()
+
+        with patch('payments.tasks.get_gateway') as mock_gateway, \
+                patch('payments.tasks.complete_refund.apply_async') as mock_apply:
+            mock_gateway.return_value.latency.return_value = 4
+            result = process_refund(str(refund.id))
+
+        self.assertEqual(result['status'], 'pending')
+        mock_apply.assert_called_once_with(args=[str(refund.id)], countdown=4)
+
+    @override_settings(REFUND_SUCCESS_RATE=1.0)
+    def test_complete_refund_succeeds(self):
+        """Test a successful refund is settled and emits refund.succeeded"""
+        from payments.tasks import complete_refund
+        refund = self._create_refund()
+        OutboxMessage.objects.all().delete()
+
+        result = complete_refund(str(refund.id))
+
+        refund.refresh_from_db()
+        self.transaction.refresh_from_db()
+        self.assertEqual(result['status'], 'succeeded')
+        self.assertEqual(refund.status, 'succeeded')
+        self.assertIsNotNone(refund.processed_at)
+        self.assertEqual(self.transaction.refunded_amount, Decimal('40.00'))
+        self.assertEqual(
+            OutboxMessage.objects.get().args, [str(refund.id), 'refund.succeeded']
+        )
+
+    @override_settings(REFUND_SUCCESS_RATE=0.0)
+    def test_failed_refund_releases_amount(self):
+        """Test a failed refund gives its amount back to the transaction"""
+        from payments.tasks import complete_refund
+        refund = self._create_refund()
+        OutboxMessage.objects.all().delete()
+
+        complete_refund(str(refund.id))
+
+        refund.refresh_from_db()
+        self.transaction.refresh_from_db()
+        self.assertEqual(refund.status, 'failed')
+        self.assertEqual(refund.failure_reason, 'Refund processing failed (simulated failure)')
+        self.assertEqual(self.transaction.refunded_amount, Decimal('0.00'))
+        self.assertTrue(self.transaction.is_refundable)
+        self.assertEqual(OutboxMessage.objects.get().args, [str(refund.id), 'refund.failed'])
+
+    @override_settings(REFUND_SUCCESS_RATE=0.0)
+    def test_duplicate_completion_skipped(self):
+        """Test a redelivered completion does not release the amount twice"""
+        from payments.tasks import complete_refund
+        refund = self._create_refund()
+        complete_refund(str(refund.id))
+
+        result = complete_refund(str(refund.id))
+
+        self.transaction.refresh_from_db()
+        self.assertEqual(result['status'], 'skipped')
+        self.assertEqual(self.transaction.refunded_amount, Decimal('0.00'))
+
+    def test_in_flight_completion_skipped(self):
+        """Test a redelivered completion never calls the processor for a claimed refund"""
+        from payments.tasks import complete_refund
+        refund = self._create_refund()
+        Refund.objects.filter(id=refund.id).transition('processing')
+
+        with patch('payments.tasks.get_gateway') as mock_gateway:
+            result = complete_refund(str(refund.id))
+
+        self.assertEqual(result['status'], 'skipped')
+        mock_gateway.return_value.refund.assert_not_called()
+
+    @override_settings(REFUND_SUCCESS_RATE=1.0)
+    def test_retry_resumes_claimed_refund(self):
+        """Test a retry settles the refund its first attempt already claimed"""
+        from payments.tasks import complete_refund
+        refund = self._create_refund()
+        Refund.objects.filter(id=refund.id).transition('processing')
+
+        result = complete_refund.apply(args=[str(refund.id)], retries=1).get()
+
+        refund.refresh_from_db()
+        self.assertEqual(result['status'], 'succeeded')
+        self.assertEqual(refund.status, 'succeeded')
+
+
+class OutboxRelayTest(TestCase):
+    """Test cases for the outbox relay"""
+
+    @patch('payments.outbox.current_app')
+    def test_relay_batch_publishes_and_deletes(self, mock_app):
+        """Test relaying publishes queued messages in order and removes them"""
+        from payments.outbox import relay_batch
+        for index in range(3):
+            OutboxMessage.objects.create(
+                task_name='payments.tasks.process_transaction',
+                args=[f'id-{index}']
+            )
+
+        self.assertEqual(relay_batch(2), 2)
+
+        sent_args = [call.kwargs['args'] for call in mock_app.send_task.call_args_list]
+        self.assertEqual(sent_args, [['id-0'], ['id-1']])
+        self.assertEqual(list(OutboxMessage.objects.values_list('args', flat=True)), [['id-2']])
+
+    @patch('payments.outbox.current_app')
+    def test_relay_batch_keeps_messages_on_broker_error(self, mock_app):
+        """Test messages stay queued when publishing fails"""
+        from payments.outbox import relay_batch
+        mock_app.send_task.side_effect = ConnectionError('broker unavailable')
+        OutboxMessage.objects.create(task_name='payments.tasks.process_transaction', args=['id'])
+
+        with self.assertRaises(ConnectionError):
+            relay_batch(10)
+
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+    @override_settings(OUTBOX_RELAY_MAX_BACKOFF_SECONDS=3)
+    @patch('payments.management.commands.relay_outbox.close_old_connections')
+    @patch('payments.management.commands.relay_outbox.time.sleep')
+    @patch('payments.management.commands.relay_outbox.relay_batch')
+    def test_relay_command_survives_failing_batches(self, mock_relay_batch, mock_sleep, _):
+        """Test the relay loop backs off on errors and keeps relaying"""
+        import io
+        from django.core.management import call_command
+        mock_relay_batch.side_effect = [
+            ConnectionError('broker unavailable'),
+            ConnectionError('broker unavailable'),
+            ConnectionError('broker unavailable'),
+            10,
+            KeyboardInterrupt,
+        ]
+
+        call_command('relay_outbox', batch_size=10, interval=1, stdout=io.StringIO())
+
+        self.assertEqual(mock_relay_batch.call_count, 5)
+        self.assertEqual([call.args[0] for call in mock_sleep.call_args_list], [2, 3, 3])
+
+
+class ReconciliationTest(TestCase):
+    """Test cases for the stuck-transaction sweeper"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+
+    def _create(self, status, age_seconds):
+        transaction = Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('10.00'),
+            currency='USD',
+            status=status
+        )
+        # Bypass auto_now to age the row
+        Transaction.objects.filter(id=transaction.id).update(
+            updated_at=timezone.now() - timedelta(seconds=age_seconds)
+        )
+        return transaction
+
+    @override_settings(TRANSACTION_STUCK_THRESHOLD_SECONDS=300, TRANSACTION_PROCESSING_MODE='deferred')
+    def test_redrives_stuck_transactions(self):
+        """Test old in-flight rows are reset and queued again"""
+        from payments.tasks import reconcile_stuck_transactions
+        stuck_processing = self._create('processing', 600)
+        stuck_pending = self._create('pending', 600)
+        recent = self._create('processing', 10)
+        settled = self._create('succeeded', 600)
+
+        result = reconcile_stuck_transactions()
+
+        self.assertEqual(result['redriven'], 2)
+        stuck_processing.refresh_from_db()
+        recent.refresh_from_db()
+        settled.refresh_from_db()
+        self.assertEqual(stuck_processing.status, 'pending')
+        self.assertEqual(recent.status, 'processing')
+        self.assertEqual(settled.status, 'succeeded')
+        queued = sorted(message.args[0] for message in OutboxMessage.objects.all())
+        self.assertEqual(queued, sorted([str(stuck_processing.id), str(stuck_pending.id)]))
+
+        # Re-driven rows are fresh again and not picked up twice
+        self.assertEqual(reconcile_stuck_transactions()['redriven'], 0)
+
+    @override_settings(TRANSACTION_STUCK_THRESHOLD_SECONDS=300)
+    def test_redrives_stuck_refunds(self):
+        """Test old in-flight refunds are reset and queued again"""
+        from payments.tasks import reconcile_stuck_refunds
+        transaction = self._create('succeeded', 0)
+        stuck, recent = [
+            Refund.objects.create(transaction=transaction, amount=Decimal('1.00'), status='processing')
+            for _ in range(2)
+        ]
+        Refund.objects.filter(id=stuck.id).update(updated_at=timezone.now() - timedelta(seconds=600))
+
+        result = reconcile_stuck_refunds()
+
+        self.assertEqual(result['redriven'], 1)
+        stuck.refresh_from_db()
+        recent.refresh_from_db()
+        self.assertEqual(stuck.status, 'pending')
+        self.assertEqual(recent.status, 'processing')
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.task_name, 'payments.tasks.process_refund')
+        self.assertEqual(message.args, [str(stuck.id)])
+
+    @patch('payments.tasks.complete_transaction.apply_async')
+    def test_duplicate_process_message_is_ignored(self, mock_apply_async):
+        """Test process_transaction skips transactions that were already claimed"""
+        from payments.tasks import process_transaction
+        transaction = self._create('processing', 0)
+
+        result = process_transaction(str(transaction.id))
+
+        self.assertEqual(result['status'], 'skipped')
+        mock_apply_async.assert_not_called()
+
+
+class StatusTransitionTest(TestCase):
+    """Test cases for compare-and-set status transitions"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.transaction = Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('100.00'),
+            currency='USD'
+        )
+
+    def test_allowed_transition_wins_once(self):
+        """Test a transition succeeds once and a duplicate loses"""
+        queryset = Transaction.objects.filter(id=self.transaction.id)
+
+        self.assertEqual(queryset.transition('processing'), 1)
+        self.assertEqual(queryset.transition('processing'), 0)
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.status, 'processing')
+
+    def test_terminal_state_is_not_overwritten(self):
+        """Test settled transactions cannot move to another status"""
+        queryset = Transaction.objects.filter(id=self.transaction.id)
+        queryset.transition('processing')
+        queryset.transition('failed', failure_reason='Declined')
+
+        self.assertEqual(queryset.transition('succeeded'), 0)
+        self.assertEqual(queryset.transition('pending'), 0)
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.status, 'failed')
+        self.assertEqual(self.transaction.failure_reason, 'Declined')
+
+    def test_unknown_target_status(self):
+        """Test transitions into a status nothing leads to are rejected"""
+        with self.assertRaises(ValueError):
+            Transaction.objects.filter(id=self.transaction.id).transition('pending_review')
+
+    def test_refund_transition(self):
+        """Test refunds are claimed before settling and settle exactly once"""
+        self.transaction.status = 'succeeded'
+        self.transaction.save()
+        refund = Refund.objects.create(
+            transaction=self.transaction,
+            amount=Decimal('10.00'),
+            reason='Customer request'
+        )
+        queryset = Refund.objects.filter(id=refund.id)
+
+        self.assertEqual(queryset.transition('succeeded'), 0)
+        self.assertEqual(queryset.transition('processing'), 1)
+        self.assertEqual(queryset.transition('processing'), 0)
+        self.assertEqual(queryset.transition('succeeded'), 1)
+        self.assertEqual(queryset.transition('failed'), 0)
+
+    def test_settlement_loses_to_concurrent_redrive(self):
+        """Test a completion does not settle a transaction re-driven mid-charge"""
+        from payments.gateways import ChargeResult
+        from payments.tasks import complete_transaction
+        queryset = Transaction.objects.filter(id=self.transaction.id)
+        queryset.transition('processing')
+
+        def redrive_during_charge(transaction):
+            queryset.transition('pending')
+            return ChargeResult(success=True, failure_reason=None)
+
+        with patch('payments.gateways.SimulatedGateway.charge', side_effect=redrive_during_charge):
+            result = complete_transaction(str(self.transaction.id))
+
+        self.assertEqual(result['status'], 'skipped')
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.status, 'pending')
+        self.assertFalse(OutboxMessage.objects.exists())
+
+
+class BulkTransactionAPITest(APITestCase):
+    """Test cases for the bulk transaction endpoint"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.token = Token.objects.create(user=self.merchant)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = reverse('payments:bulk-create-transactions')
+
+    def _items(self, count):
+        return [
+            {'amount': f'{index + 1}.00', 'currency': 'USD', 'description': f'Order #{index}'}
+            for index in range(count)
+        ]
+
+    @override_settings(TRANSACTION_PROCESSING_MODE='deferred')
+    def test_bulk_create_with_per_item_results(self):
+        """Test valid items are created and invalid ones reported by index"""
+        items = self._items(3)
+        items.insert(1, {'amount': '-5.00', 'currency': 'USD', 'description': 'Bad'})
+
+        response = self.client.post(self.url, {'transactions': items}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.data['data']
+        self.assertEqual(data['created'], 3)
+        self.assertEqual(data['failed'], 1)
+        self.assertEqual([result['index'] for result in data['results']], [0, 1, 2, 3])
+        self.assertFalse(data['results'][1]['success'])
+        self.assertIn('amount', data['results'][1]['error'])
+        self.assertEqual(data['results'][3]['data']['amount'], '3.00')
+
+        created_ids = {result['data']['id'] for result in data['results'] if result['success']}
+        self.assertEqual(Transaction.objects.filter(merchant=self.merchant).count(), 3)
+        self.assertEqual(len(set(Transaction.objects.values_list('payment_key', flat=True))), 3)
+        queued = {message.args[0] for message in OutboxMessage.objects.all()}
+        self.assertEqual(queued, created_ids)
+
+    def test_bulk_create_query_count_is_constant(self):
+        """Test the number of queries does not grow with the batch size"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, {'transactions': self._items(2)}, format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(self.url, {'transactions': self._items(20)}, format='json')
+
+        self.assertEqual(len(small), len(large))
+
+    @override_settings(TRANSACTION_BULK_MAX_ITEMS=2)
+    def test_bulk_create_too_many_items(self):
+        """Test batches over the configured limit are rejected"""
+        response = self.client.post(self.url, {'transactions': self._items(3)}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_bulk_create_all_invalid(self):
+        """Test a batch without any valid item fails"""
+        response = self.client.post(
+            self.url,
+            {'transactions': [{'amount': '0', 'currency': 'USD', 'description': 'Bad'}]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(response.data['success'])
+
+
+class BulkRefundAPITest(APITestCase):
+    """Test cases for the bulk refund endpoint"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.token = Token.objects.create(user=self.merchant)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = reverse('refunds:bulk-create-refunds')
+        self.transactions = [
+            Transaction.objects.create(
+                merchant=self.merchant,
+                amount=Decimal('100.00'),
+                currency='USD',
+                status='succeeded'
+            )
+            for _ in range(3)
+        ]
+
+    def _items(self, count, amount='10.00'):
+        return [
+            {'transaction': str(self.transactions[index % 3].id), 'amount': amount, 'reason': 'Recall'}
+            for index in range(count)
+        ]
+
+    def test_bulk_refund_with_per_item_results(self):
+        """Test valid items are refunded and rejected ones reported by index"""
+        pending = Transaction.objects.create(merchant=self.merchant, amount=Decimal('5.00'), currency='USD')
+        other = Transaction.objects.create(
+            merchant=Merchant.objects.create_user(email='other@example.com', password='pass123'),
+            amount=Decimal('5.00'),
+            currency='USD',
+            status='succeeded'
+        )
+        items = self._items(2) + [
+            {'transaction': str(pending.id), 'amount': '1.00', 'reason': 'Recall'},
+            {'transaction': str(other.id), 'amount': '1.00', 'reason': 'Recall'},
+            {'transaction': str(self.transactions[0].id), 'amount': '0', 'reason': 'Recall'},
+        ]
+
+        response = self.client.post(self.url, {'refunds': items}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.data['data']
+        self.assertEqual((data['created'], data['failed']), (2, 3))
+        self.assertEqual([result['success'] for result in data['results']], [True, True, False, False, False])
+        self.assertIn('transaction', data['results'][2]['error'])
+        self.assertEqual(data['results'][3]['error'], {'transaction': ['Transaction not found']})
+        self.assertIn('amount', data['results'][4]['error'])
+        self.assertEqual(data['results'][0]['data']['status'], 'pending')
+
+        created_ids = {result['data']['id'] for result in data['results'] if result['success']}
+        self.assertEqual(set(str(id) for id in Refund.objects.values_list('id', flat=True)), created_ids)
+        self.assertEqual(
+            OutboxMessage.objects.filter(task_name='payments.tasks.process_refund').count(), 2
+        )
+        self.assertEqual(
+            OutboxMessage.objects.filter(task_name='webhooks.tasks.send_refund_webhook_notification').count(), 2
+        )
+
+    def test_bulk_refund_applies_items_in_order(self):
+        """Test items on the same transaction stop at its refundable amount"""
+        transaction = self.transactions[0]
+        Transaction.objects.filter(id=transaction.id).reserve_refund(Decimal('30.00'))
+        items = [
+            {'transaction': str(transaction.id), 'amount': amount, 'reason': 'Recall'}
+            for amount in ('50.00', '30.00', '20.00')
+        ]
+
+        response = self.client.post(self.url, {'refunds': items}, format='json')
+
+        data = response.data['data']
+        self.assertEqual([result['success'] for result in data['results']], [True, False, True])
+        self.assertEqual(
+            data['results'][1]['error'],
+            {'amount': ['Refund amount cannot exceed refundable amount (20.00)']}
+        )
+        updated_at = transaction.updated_at
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.refunded_amount, Decimal('100.00'))
+        self.assertGreater(transaction.updated_at, updated_at)
+        self.assertFalse(transaction.is_refundable)
+
+    def test_bulk_refund_query_count_is_constant(self):
+        """Test the number of queries does not grow with the batch size"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, {'refunds': self._items(3, '1.00')}, format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(self.url, {'refunds': self._items(30, '1.00')}, format='json')
+
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(Refund.objects.count(), 33)
+
+    @override_settings(REFUND_BULK_MAX_ITEMS=2)
+    def test_bulk_refund_too_many_items(self):
+        """Test batches over the configured limit are rejected"""
+        response = self.client.post(self.url, {'refunds': self._items(3)}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Refund.objects.exists())
+
+    def test_bulk_refund_nothing_refundable(self):
+        """Test a batch whose items are all rejected creates nothing"""
+        response = self.client.post(self.url, {'refunds': self._items(1, '500.00')}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['data']['created'], 0)
+        self.assertFalse(Refund.objects.exists())
+        self.assertFalse(OutboxMessage.objects.exists())
+
+
+class IdempotencyTest(APITestCase):
+    """Test cases for Idempotency-Key support"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.token = Token.objects.create(user=self.merchant)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = reverse('payments:create-transaction')
+        self.data = {'amount': '100.00', 'currency': 'USD', 'description': 'Order #1'}
+        self.key = str(uuid.uuid4())
+
+    def test_replay_returns_stored_response(self):
+        """Test a retried request replays the first response without touching the database"""
+        first = self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY=self.key)
+
+        with self.assertNumQueries(0):
+            second = self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY=self.key)
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_different_keys_create_separate_transactions(self):
+        """Test requests without a shared key are processed independently"""
+        self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY=self.key)
+        self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY=str(uuid.uuid4()))
+        self.client.post(self.url, self.data, format='json')
+
+        self.assertEqual(Transaction.objects.count(), 3)
+
+    def test_key_reuse_with_different_body(self):
+        """Test reusing a key with another payload is rejected"""
+        self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY=self.key)
+        response = self.client.post(
+            self.url,
+            dict(self.data, amount='200.00'),
+            format='json',
+            HTTP_IDEMPOTENCY_KEY=self.key
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCY_LOCK_WAIT_SECONDS=0.1)
+    @patch('payment_api.idempotency.get_redis')
+    def test_concurrent_duplicate_is_rejected(self, mock_get_redis):
+        """Test a duplicate arriving while the first request holds the lock gets 409"""
+        mock_get_redis.return_value.get.return_value = None
+        mock_get_redis.return_value.set.return_value = False
+
+        response = self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY=self.key)
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Transaction.objects.exists())
+
+    @patch('payment_api.idempotency.get_redis')
+    def test_redis_unavailable_fails_open(self, mock_get_redis):
+        """Test requests are still served when Redis is down"""
+        import redis
+        mock_get_redis.return_value.get.side_effect = redis.ConnectionError('down')
+
+        response = self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY=self.key)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Transaction.objects.count(), 1)
+
+
+class CursorPaginationTest(APITestCase):
+    """Test cases for keyset pagination of transactions"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.token = Token.objects.create(user=self.merchant)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.transactions = [
+            Transaction.objects.create(
+                merchant=self.merchant,
+                amount=Decimal('10.00'),
+                currency='USD',
+                description=f'Order #{index}'
+            )
+            for index in range(5)
+        ]
+
+    def test_cursor_pages_cover_all_rows(self):
+        """Test following next cursors returns every transaction once, newest first"""
+        url = reverse('payments:list-transactions') + '?pagination=cursor&page_size=2'
+        seen = []
+
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            seen.extend(item['id'] for item in response.data['results']['data'])
+            url = response.data['next']
+
+        expected = [str(transaction.id) for transaction in sorted(
+            self.transactions, key=lambda transaction: (transaction.created_at, transaction.id), reverse=True
+        )]
+        self.assertEqual(seen, expected)
+
+    def test_cursor_pagination_skips_count_query(self):
+        """Test cursor pages do not run COUNT(*)"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('payments:list-transactions') + '?pagination=cursor')
+
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+
+class TransactionQueryCountTest(APITestCase):
+    """Test cases locking in a fixed number of queries for transaction reads"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.token = Token.objects.create(user=self.merchant)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.transactions = [
+            Transaction.objects.create(
+                merchant=self.merchant,
+                amount=Decimal('10.00'),
+                currency='USD',
+                status='succeeded'
+            )
+            for _ in range(10)
+        ]
+        for transaction in self.transactions[:4]:
+            Transaction.objects.filter(id=transaction.id).reserve_refund(Decimal('10.00'))
+            Refund.objects.create(
+                transaction=transaction,
+                amount=Decimal('10.00'),
+                reason='Customer request'
+            )
+
+    def test_list_transactions_query_count(self):
+        """Test listing costs authentication, count and one page query"""
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('payments:list-transactions') + '?page_size=100')
+
+        data = response.data['results']['data']
+        self.assertEqual(len(data), 10)
+        self.assertEqual(sum(item['is_refundable'] for item in data), 6)
+        self.assertTrue(all(item['merchant_email'] == 'merchant@example.com' for item in data))
+
+    def test_get_transaction_query_count(self):
+        """Test fetching one transaction costs authentication and one query"""
+        refunded = self.transactions[0]
+        url = reverse('payments:get-transaction', kwargs={'transaction_id': refunded.id})
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+
+        self.assertFalse(response.data['data']['is_refundable'])
+        self.assertEqual(response.data['data']['merchant_email'], 'merchant@example.com')
+
+
+class FastSerializerTest(TestCase):
+    """Test cases for the .values() based read serializers"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        refunded = Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('100.50'),
+            currency='EUR',
+            description='Refunded order',
+            status='succeeded',
+            refunded_amount=Decimal('30.00'),
+            processed_at=timezone.now()
+        )
+        Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('20.00'),
+            currency='USD',
+            description='Failed order',
+            status='failed',
+            failure_reason='Declined',
+            processed_at=timezone.now()
+        )
+        Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('7.10'),
+            currency='GBP',
+            description='Succeeded order',
+            status='succeeded'
+        )
+        Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('1.00'),
+            currency='USD',
+            description='Pending order'
+        )
+        Refund.objects.create(
+            transaction=refunded,
+            amount=Decimal('30.00'),
+            reason='Customer request'
+        )
+
+    def _render(self, data):
+        import json
+        from rest_framework.renderers import JSONRenderer
+        return json.loads(JSONRenderer().render(data))
+
+    def test_transaction_fast_serializer_matches(self):
+        """Test the fast transaction output equals TransactionSerializer output"""
+        from payments.serializers import TransactionSerializer, TransactionFastSerializer
+        queryset = Transaction.objects.all()
+
+        expected = self._render(TransactionSerializer(queryset, many=True).data)
+        actual = self._render(TransactionFastSerializer.serialize(TransactionFastSerializer.values(queryset)))
+
+        self.assertEqual(actual, expected)
+
+    def test_refund_fast_serializer_matches(self):
+        """Test the fast refund output equals RefundSerializer output"""
+        from payments.serializers import RefundSerializer, RefundFastSerializer
+        queryset = Refund.objects.all()
+
+        expected = self._render(RefundSerializer(queryset, many=True).data)
+        actual = self._render(RefundFastSerializer.serialize(RefundFastSerializer.values(queryset)))
+
+        self.assertEqual(actual, expected)
+
+
+class ORJSONRendererTest(APITestCase):
+    """Test cases for the orjson renderer and parser"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.token = Token.objects.create(user=self.merchant)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.transaction = Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('100.00'),
+            currency='USD',
+            status='succeeded'
+        )
+
+    def test_renders_same_json_as_drf(self):
+        """Test ORJSONRenderer output decodes to the same data as JSONRenderer"""
+        import json
+        from rest_framework.renderers import JSONRenderer
+        from payment_api.renderers import ORJSONRenderer
+        from payments.serializers import TransactionSerializer
+
+        data = {
+            'transaction': TransactionSerializer(self.transaction).data,
+            'amount': Decimal('1.50'),
+            'reference': uuid.uuid4(),
+            'at': timezone.now(),
+            'errors': {0: ['invalid']},
+        }
+
+        expected = json.loads(JSONRenderer().render(data))
+        expected['errors'] = {'0': ['invalid']}
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)), expected)
+
+    def test_api_response_uses_orjson(self):
+        """Test API responses are rendered by the orjson renderer"""
+        url = reverse('payments:get-transaction', kwargs={'transaction_id': self.transaction.id})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json()['data']['id'], str(self.transaction.id))
+
+    def test_invalid_json_body_is_rejected(self):
+        """Test a malformed JSON body returns 400"""
+        response = self.client.post(
+            reverse('payments:create-transaction'),
+            data='{"amount": ',
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TransactionExportTest(APITestCase):
+    """Test cases for streaming transaction exports"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.token = Token.objects.create(user=self.merchant)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = reverse('payments:export-transactions')
+        self.transactions = [
+            Transaction.objects.create(
+                merchant=self.merchant,
+                amount=Decimal('10.00'),
+                currency='USD',
+                status='succeeded' if index % 2 else 'failed'
+            )
+            for index in range(5)
+        ]
+        other = Merchant.objects.create_user(email='other@example.com', password='pass123')
+        Transaction.objects.create(merchant=other, amount=Decimal('10.00'), currency='USD')
+
+    def _content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        """Test NDJSON export streams one document per merchant transaction"""
+        import json
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self._content(response).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [str(t.id) for t in self.transactions])
+        self.assertEqual(rows[0]['amount'], '10.00')
+
+    def test_export_csv_with_status_filter(self):
+        """Test CSV export honours the status filter"""
+        import csv
+        import io
+        response = self.client.get(self.url, {'output': 'csv', 'status': 'succeeded'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(self._content(response))))
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(all(row['status'] == 'succeeded' for row in rows))
+
+    def test_export_date_filter(self):
+        """Test created_after/created_before bound the export"""
+        Transaction.objects.filter(id=self.transactions[0].id).update(
+            created_at=timezone.now() - timedelta(days=10)
+        )
+        response = self.client.get(self.url, {
+            'created_after': (timezone.now() - timedelta(days=1)).isoformat()
+        })
+
+        self.assertEqual(len(self._content(response).splitlines()), 4)
+
+    @override_settings(TRANSACTION_EXPORT_CHUNK_SIZE=2)
+    async def test_export_streams_lazily_under_asgi(self):
+        """Test the ASGI export pulls rows a chunk at a time instead of draining the cursor"""
+        from payments.serializers import TransactionFastSerializer
+        to_representation = TransactionFastSerializer.to_representation
+        serialized = []
+
+        def track(row):
+            serialized.append(row)
+            return to_representation(row)
+
+        with patch.object(TransactionFastSerializer, 'to_representation', side_effect=track):
+            response = await self.async_client.get(
+                self.url, headers={'Authorization': f'Token {self.token.key}'}
+            )
+            self.assertTrue(response.is_async)
+            stream = aiter(response.streaming_content)
+            await anext(stream)
+            self.assertEqual(len(serialized), 2)
+            rest = [chunk async for chunk in stream]
+
+        self.assertEqual(len(rest), 4)
+        self.assertEqual(len(serialized), 5)
+
+    def test_export_invalid_params(self):
+        """Test invalid export parameters are rejected"""
+        response = self.client.get(self.url, {'output': 'xml'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(response.data['success'])
+
+
+class ConditionalGetTest(APITestCase):
+    """Test cases for ETag revalidation of transactions and refunds"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.token = Token.objects.create(user=self.merchant)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.transaction = Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('100.00'),
+            currency='USD',
+            status='succeeded'
+        )
+        self.url = reverse('payments:get-transaction', kwargs={'transaction_id': self.transaction.id})
+
+    def test_matching_etag_returns_304(self):
+        """Test revalidating with the current ETag returns an empty 304"""
+        # In-flight transactions bypass the cache and revalidate against the database
+        Transaction.objects.filter(id=self.transaction.id).update(status='processing')
+        etag = self.client.get(self.url)['ETag']
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_status_change_changes_etag(self):
+        """Test a status change invalidates the ETag"""
+        Transaction.objects.filter(id=self.transaction.id).update(status='processing')
+        etag = self.client.get(self.url)['ETag']
+        Transaction.objects.filter(id=self.transaction.id).update(
+            status='failed', updated_at=timezone.now()
+        )
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['data']['status'], 'failed')
+
+    def test_refund_changes_transaction_etag(self):
+        """Test creating a refund changes the transaction ETag via updated_at"""
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('refunds:create-refund'), {
+                'transaction': str(self.transaction.id),
+                'amount': '10.00',
+                'reason': 'Customer request'
+            }, format='json')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['refunded_amount'], '10.00')
+
+    def test_refund_etag(self):
+        """Test refunds support conditional GET"""
+        refund = Refund.objects.create(transaction=self.transaction, amount=Decimal('10.00'))
+        url = reverse('refunds:get-refund', kwargs={'refund_id': refund.id})
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=f'W/{etag}')
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_unknown_transaction_with_etag_returns_404(self):
+        """Test revalidating a missing transaction returns 404"""
+        url = reverse('payments:get-transaction', kwargs={'transaction_id': uuid.uuid4()})
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"stale"')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ResourceCacheTest(APITestCase):
+    """Test cases for the read-through cache of terminal transactions and refunds"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.token = Token.objects.create(user=self.merchant)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.transaction = Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('100.00'),
+            currency='USD',
+            status='succeeded'
+        )
+        self.url = reverse('payments:get-transaction', kwargs={'transaction_id': self.transaction.id})
+
+    def test_terminal_transaction_served_from_cache(self):
+        """Test a settled transaction is read from the database only once"""
+        first = self.client.get(self.url)
+
+        # Only the token lookup remains
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url)
+
+        self.assertEqual(second.data['data'], first.data['data'])
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_cached_transaction_revalidates(self):
+        """Test a cache hit still answers If-None-Match with 304"""
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_in_flight_transaction_not_cached(self):
+        """Test pending transactions always come from the database"""
+        from django.core.cache import cache
+        from payments.cache import transaction_cache_key
+        Transaction.objects.filter(id=self.transaction.id).update(status='pending')
+
+        self.client.get(self.url)
+
+        self.assertIsNone(cache.get(transaction_cache_key(self.merchant.id, self.transaction.id)))
+
+    def test_replica_read_not_cached(self):
+        """Test rows read from the replica never fill the cache"""
+        from payments.cache import is_cacheable
+
+        self.assertTrue(is_cacheable(Transaction, 'succeeded', 'default'))
+        self.assertFalse(is_cacheable(Transaction, 'succeeded', 'replica'))
+        self.assertFalse(is_cacheable(Transaction, 'processing', 'default'))
+
+    def test_cache_is_scoped_to_merchant(self):
+        """Test another merchant cannot read a cached transaction"""
+        self.client.get(self.url)
+        other = Merchant.objects.create_user(email='other@example.com', password='pass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=other).key}')
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_refund_invalidates_transaction(self):
+        """Test creating a refund drops the cached transaction"""
+        self.assertTrue(self.client.get(self.url).data['data']['is_refundable'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('refunds:create-refund'), {
+                'transaction': str(self.transaction.id),
+                'amount': '10.00',
+                'reason': 'Customer request'
+            }, format='json')
+
+        self.assertEqual(self.client.get(self.url).data['data']['refunded_amount'], '10.00')
+
+    def test_settlement_invalidates_transaction(self):
+        """Test settling a transaction drops any cached copy"""
+        from django.core.cache import cache
+        from payments.cache import transaction_cache_key
+        from payments.tasks import _save_settlement
+        key = transaction_cache_key(self.merchant.id, self.transaction.id)
+        cache.set(key, {'etag': '"stale"', 'data': {}})
+        Transaction.objects.filter(id=self.transaction.id).update(status='processing')
+        self.transaction.status = 'failed'
+        self.transaction.processed_at = timezone.now()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            _save_settlement([self.transaction])
+
+        self.assertIsNone(cache.get(key))
+
+    def test_refund_served_from_cache(self):
+        """Test a settled refund is read from the database only once"""
+        refund = Refund.objects.create(
+            transaction=self.transaction,
+            amount=Decimal('10.00'),
+            status='succeeded'
+        )
+        url = reverse('refunds:get-refund', kwargs={'refund_id': refund.id})
+        self.client.get(url)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+
+        self.assertEqual(response.data['data']['id'], str(refund.id))
+
+    def test_cache_outage_falls_back_to_database(self):
+        """Test an unavailable cache does not fail reads"""
+        import redis
+        with patch('payments.cache.cache.get', side_effect=redis.ConnectionError), \
+                patch('payments.cache.cache.set', side_effect=redis.ConnectionError):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class MerchantSummaryTest(APITestCase):
+    """Test cases for the incrementally maintained merchant summary"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.token = Token.objects.create(user=self.merchant)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def _settle(self, outcomes):
+        from payments.tasks import _save_settlement
+        transactions = []
+        for amount, currency, outcome in outcomes:
+            transaction = Transaction.objects.create(
+                merchant=self.merchant,
+                amount=Decimal(amount),
+                currency=currency,
+                status='processing'
+            )
+            transaction.status = outcome
+            transaction.processed_at = timezone.now()
+            transactions.append(transaction)
+        _save_settlement(transactions)
+        return transactions
+
+    def test_settlement_increments_buckets(self):
+        """Test settled transactions are added to their status and currency bucket"""
+        from payments.models import MerchantSummary
+        self._settle([('10.00', 'USD', 'succeeded'), ('5.50', 'USD', 'succeeded')])
+        self._settle([('7.00', 'USD', 'failed'), ('3.00', 'EUR', 'succeeded')])
+
+        buckets = {
+            (bucket.currency, bucket.status): (bucket.count, bucket.total_amount)
+            for bucket in MerchantSummary.objects.filter(merchant=self.merchant, kind='transaction')
+        }
+        self.assertEqual(buckets, {
+            ('USD', 'succeeded'): (2, Decimal('15.50')),
+            ('USD', 'failed'): (1, Decimal('7.00')),
+            ('EUR', 'succeeded'): (1, Decimal('3.00')),
+        })
+
+    def test_lost_settlement_not_counted(self):
+        """Test a transition that lost the race does not touch the summary"""
+        from payments.models import MerchantSummary
+        from payments.tasks import _save_settlement
+        transaction = self._settle([('10.00', 'USD', 'succeeded')])[0]
+
+        transaction.status = 'failed'
+        _save_settlement([transaction])
+
+        self.assertFalse(MerchantSummary.objects.filter(status='failed').exists())
+
+    def test_summary_endpoint(self):
+        """Test the summary endpoint reads transaction and refund buckets"""
+        from payments.tasks import complete_refund
+        transaction = self._settle([('100.00', 'USD', 'succeeded')])[0]
+        response = self.client.post(reverse('refunds:create-refund'), {
+            'transaction': str(transaction.id),
+            'amount': '40.00',
+            'reason': 'Customer request'
+        }, format='json')
+        with override_settings(REFUND_SUCCESS_RATE=1.0):
+            complete_refund(response.data['data']['id'])
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('payments:transaction-summary'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['transactions'], [
+            {'currency': 'USD', 'status': 'succeeded', 'count': 1, 'total_amount': '100.00'}
+        ])
+        self.assertEqual(response.data['data']['refunds'], [
+            {'currency': 'USD', 'status': 'succeeded', 'count': 1, 'total_amount': '40.00'}
+        ])
+
+    def test_concurrent_bucket_creation(self):
+        """Test losing the insert race on a new bucket falls back to the increment"""
+        from django.db.models import QuerySet
+        from payments import summary
+        from payments.models import MerchantSummary
+        MerchantSummary.objects.create(
+            merchant=self.merchant, kind='transaction', currency='USD', status='succeeded',
+            count=1, total_amount=Decimal('2.00')
+        )
+        update = QuerySet.update
+        calls = []
+
+        def racing_update(queryset, **kwargs):
+            # The first UPDATE runs before the concurrent writer's INSERT commits
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else update(queryset, **kwargs)
+
+        with patch.object(QuerySet, 'update', racing_update):
+            summary.record('transaction', [(self.merchant.id, 'USD', 'succeeded', Decimal('2.00'))])
+
+        bucket = MerchantSummary.objects.get(merchant=self.merchant)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual((bucket.count, bucket.total_amount), (2, Decimal('4.00')))
+
+
+class AnalyticsRollupTest(APITestCase):
+    """Test cases for the hourly and daily analytics rollups"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.token = Token.objects.create(user=self.merchant)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.hour = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=3)
+
+    def _transaction(self, status, amount, at, currency='USD'):
+        transaction = Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal(amount),
+            currency=currency,
+            status=status
+        )
+        Transaction.objects.filter(id=transaction.id).update(
+            created_at=at, processed_at=at if status in ('succeeded', 'failed') else None
+        )
+        return transaction
+
+    def _rollup(self, granularity, bucket_start, currency='USD'):
+        from payments.models import TransactionRollup
+        return TransactionRollup.objects.get(
+            merchant=self.merchant, granularity=granularity,
+            bucket_start=bucket_start, currency=currency
+        )
+
+    def test_builds_hourly_and_daily_buckets(self):
+        """Test settled transactions and refunds are folded into both granularities"""
+        from payments.rollups import build_rollups
+        succeeded = self._transaction('succeeded', '100.00', self.hour + timedelta(minutes=5))
+        self._transaction('succeeded', '50.00', self.hour + timedelta(minutes=10))
+        self._transaction('failed', '30.00', self.hour + timedelta(minutes=20))
+        self._transaction('pending', '10.00', self.hour + timedelta(minutes=30))
+        refund = Refund.objects.create(transaction=succeeded, amount=Decimal('40.00'), status='succeeded')
+        Refund.objects.filter(id=refund.id).update(processed_at=self.hour + timedelta(minutes=40))
+
+        build_rollups()
+
+        hourly = self._rollup('hour', self.hour)
+        self.assertEqual(hourly.created_count, 4)
+        self.assertEqual((hourly.succeeded_count, hourly.failed_count), (2, 1))
+        self.assertEqual(hourly.volume, Decimal('150.00'))
+        self.assertEqual((hourly.refund_count, hourly.refund_volume), (1, Decimal('40.00')))
+        self.assertAlmostEqual(hourly.success_rate, 2 / 3)
+        self.assertEqual(hourly.refund_rate, 0.5)
+
+        daily = self._rollup('day', self.hour.replace(hour=0))
+        self.assertGreaterEqual(daily.created_count, 4)
+
+    def test_incremental_runs_do_not_double_count(self):
+        """Test each row is counted once across runs"""
+        from payments.rollups import build_rollups
+        lag = timedelta(seconds=settings.ANALYTICS_ROLLUP_LAG_SECONDS)
+        self._transaction('succeeded', '100.00', self.hour + timedelta(minutes=5))
+        build_rollups(now=self.hour + timedelta(minutes=30) + lag)
+        build_rollups(now=self.hour + timedelta(minutes=30) + lag)
+        self._transaction('succeeded', '20.00', self.hour + timedelta(minutes=50))
+        build_rollups()
+
+        hourly = self._rollup('hour', self.hour)
+        self.assertEqual(hourly.succeeded_count, 2)
+        self.assertEqual(hourly.volume, Decimal('120.00'))
+
+    def test_recent_rows_wait_for_lag(self):
+        """Test rows younger than the lag are left for the next run"""
+        from payments.models import TransactionRollup
+        from payments.rollups import build_rollups
+        self._transaction('succeeded', '100.00', timezone.now())
+
+        build_rollups()
+
+        self.assertFalse(TransactionRollup.objects.exists())
+
+    def test_analytics_endpoint(self):
+        """Test the analytics endpoint returns the merchant's buckets"""
+        from payments.rollups import build_rollups
+        self._transaction('succeeded', '100.00', self.hour + timedelta(minutes=5))
+        self._transaction('failed', '10.00', self.hour + timedelta(minutes=5), currency='EUR')
+        build_rollups()
+
+        response = self.client.get(reverse('payments:transaction-analytics'), {'currency': 'USD'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        buckets = response.data['data']['buckets']
+        self.assertEqual(len(buckets), 1)
+        self.assertEqual(buckets[0]['volume'], '100.00')
+        self.assertEqual(buckets[0]['success_rate'], 1.0)
+        self.assertEqual(buckets[0]['refund_rate'], 0.0)
+
+    def test_analytics_invalid_range(self):
+        """Test an inverted range is rejected"""
+        now = timezone.now()
+        response = self.client.get(reverse('payments:transaction-analytics'), {
+            'start': now.isoformat(),
+            'end': (now - timedelta(hours=1)).isoformat()
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PartitioningTest(TestCase):
+    """Test cases for monthly partitioning and archival of transactions"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+
+    def _partition_of(self, transaction):
+        from django.db import connection
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tableoid::regclass::text FROM transactions WHERE id = %s', [transaction.id])
+            return cursor.fetchone()[0]
+
+    def test_rows_are_routed_to_monthly_partitions(self):
+        """Test new transactions land in the partition of their month"""
+        from payment_api.partitioning import month_start, partition_name
+        transaction = Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('10.00'),
+            currency='USD'
+        )
+
+        self.assertEqual(
+            self._partition_of(transaction),
+            partition_name('transactions', month_start(transaction.created_at))
+        )
+
+    def test_ensure_partitions_creates_future_months(self):
+        """Test maintenance creates partitions ahead of time"""
+        from payment_api.partitioning import add_months, ensure_partitions, month_start, partition_name
+        future = add_months(month_start(timezone.now()), 12)
+        ensure_partitions('transactions', 1, now=future)
+
+        transaction = Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('10.00'),
+            currency='USD'
+        )
+        Transaction.objects.filter(id=transaction.id).update(created_at=future + timedelta(days=3))
+
+        self.assertEqual(self._partition_of(transaction), partition_name('transactions', future))
+
+    def test_archive_detaches_expired_partitions(self):
+        """Test expired partitions leave the table and move to the archive schema"""
+        from django.db import connection
+        from payment_api.partitioning import (
+            add_months, archive_partitions, create_partition, month_start, partition_name
+        )
+        old_month = add_months(month_start(timezone.now()), -6)
+        with connection.cursor() as cursor:
+            create_partition(cursor, 'transactions', old_month)
+        old = Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('10.00'),
+            currency='USD'
+        )
+        Transaction.objects.filter(id=old.id).update(created_at=old_month + timedelta(days=1))
+        recent = Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('10.00'),
+            currency='USD'
+        )
+        old_refund = Refund.objects.create(transaction=old, amount=Decimal('5.00'))
+        recent_refund = Refund.objects.create(transaction=recent, amount=Decimal('5.00'))
+
+        archived = archive_partitions('transactions', 3, 'archive')
+
+        self.assertEqual(archived, [partition_name('transactions', old_month)])
+        self.assertFalse(Transaction.objects.filter(id=old.id).exists())
+        self.assertTrue(Transaction.objects.filter(id=recent.id).exists())
+        # Refunds follow their transactions to the archive
+        self.assertEqual(list(Refund.objects.values_list('id', flat=True)), [recent_refund.id])
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM archive.{archived[0]} WHERE id = %s', [old.id])
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('SELECT amount FROM archive.refunds WHERE id = %s', [old_refund.id])
+            self.assertEqual(cursor.fetchone()[0], Decimal('5.00'))
+
+    @override_settings(PARTITION_RETENTION_MONTHS={'transactions': 24, 'webhook_logs': 3})
+    def test_maintain_partitions_task(self):
+        """Test the maintenance task covers both partitioned tables"""
+        from payments.tasks import maintain_partitions
+
+        result = maintain_partitions()
+
+        self.assertEqual(result, {'archived': {'transactions': [], 'webhook_logs': []}})
+
+
+class ReplicaRoutingTest(APITestCase):
+    """Test cases for read-replica routing and read-your-writes stickiness"""
+
+    def setUp(self):
+        from django.test import RequestFactory
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.token = Token.objects.create(user=self.merchant)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.request = RequestFactory().get('/')
+        self.request.user = self.merchant
+
+    def _read_alias(self):
+        from django.db import router
+        from payment_api.db_router import use_replica
+
+        @use_replica
+        def view(request):
+            return router.db_for_read(Transaction)
+
+        return view(self.request)
+
+    def test_reads_use_replica_inside_view(self):
+        """Test decorated views read from the replica"""
+        with patch('payment_api.db_router.replica_configured', return_value=True):
+            self.assertEqual(self._read_alias(), 'replica')
+
+    def test_reads_use_primary_elsewhere(self):
+        """Test reads outside decorated views and all writes go to the primary"""
+        from django.db import router
+        with patch('payment_api.db_router.replica_configured', return_value=True):
+            self.assertEqual(router.db_for_read(Transaction), 'default')
+            self.assertEqual(router.db_for_write(Transaction), 'default')
+
+    def test_without_replica_reads_use_primary(self):
+        """Test no replica configured keeps every read on the primary"""
+        self.assertEqual(self._read_alias(), 'default')
+
+    def test_write_pins_merchant_to_primary(self):
+        """Test a successful write keeps the merchant's reads on the primary"""
+        with patch('payment_api.db_router.replica_configured', return_value=True):
+            response = self.client.post(
+                reverse('payments:create-transaction'),
+                {'amount': '10.00', 'currency': 'USD', 'description': 'Order'},
+                format='json'
+            )
+
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(self._read_alias(), 'default')
+
+    def test_cache_outage_reads_primary(self):
+        """Test an unreachable pin store sends reads to the primary"""
+        import redis
+        with patch('payment_api.db_router.replica_configured', return_value=True), \
+                patch('payment_api.db_router.cache.get', side_effect=redis.ConnectionError):
+            self.assertEqual(self._read_alias(), 'default')
+
+
+class TransactionSearchTest(APITestCase):
+    """Test cases for trigram-backed transaction search"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.token = Token.objects.create(user=self.merchant)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = reverse('payments:search-transactions')
+        self.order = Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('10.00'),
+            currency='USD',
+            description='Order #12345 for Jane',
+            payment_key='pk_abcdef0123456789abcdef'
+        )
+        Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('10.00'),
+            currency='USD',
+            description='Subscription renewal',
+            payment_key='pk_ffff00000000000000000000'
+        )
+        other = Merchant.objects.create_user(email='other@example.com', password='pass123')
+        Transaction.objects.create(
+            merchant=other,
+            amount=Decimal('10.00'),
+            currency='USD',
+            description='Order #12345 for someone else'
+        )
+
+    def test_search_description_substring(self):
+        """Test partial order numbers match case-insensitively within the merchant"""
+        response = self.client.get(self.url, {'q': 'order #123'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data['data']], [str(self.order.id)])
+
+    def test_search_payment_key_prefix(self):
+        """Test payment_key prefixes match"""
+        response = self.client.get(self.url, {'q': 'pk_abcd'})
+
+        self.assertEqual([row['id'] for row in response.data['data']], [str(self.order.id)])
+
+    def test_search_payment_key_is_prefix_only(self):
+        """Test payment_key fragments in the middle do not match"""
+        response = self.client.get(self.url, {'q': '0123456789'})
+
+        self.assertEqual(response.data['data'], [])
+
+    @override_settings(TRANSACTION_SEARCH_MAX_RESULTS=1)
+    def test_search_limit_is_capped(self):
+        """Test limit cannot exceed TRANSACTION_SEARCH_MAX_RESULTS"""
+        response = self.client.get(self.url, {'q': 'pk_', 'limit': 10})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']), 1)
+
+    def test_search_query_too_short(self):
+        """Test queries shorter than a trigram are rejected"""
+        response = self.client.get(self.url, {'q': 'ab'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(TRANSACTION_EVENTS_TIMEOUT_SECONDS=5, TRANSACTION_EVENTS_KEEPALIVE_SECONDS=1)
+class TransactionEventsTest(TestCase):
+    """Test cases for the Server-Sent Events status stream"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.token = Token.objects.create(user=self.merchant)
+        self.transaction = Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('10.00'),
+            currency='USD'
+        )
+        self.url = reverse('payments:transaction-events', args=[self.transaction.id])
+        self.headers = {'Authorization': f'Token {self.token.key}'}
+
+    @staticmethod
+    async def read_events(response):
+        """Collect the status payloads of a stream until it closes"""
+        import orjson
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        return [
+            orjson.loads(line[len(b'data: '):])
+            for line in body.split(b'\n') if line.startswith(b'data: ')
+        ]
+
+    async def test_final_status_closes_stream(self):
+        """Test a settled transaction gets its status once and the stream ends"""
+        await Transaction.objects.filter(id=self.transaction.id).aupdate(status='failed')
+
+        response = await self.async_client.get(self.url, headers=self.headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(
+            [event['status'] for event in await self.read_events(response)], ['failed']
+        )
+
+    async def test_streams_published_changes(self):
+        """Test published changes are pushed until the transaction settles"""
+        from asgiref.sync import sync_to_async
+        from payments import events
+
+        response = await self.async_client.get(self.url, headers=self.headers)
+        stream = aiter(response.streaming_content)
+        self.assertIn(b'"status":"pending"', await anext(stream))
+
+        await sync_to_async(events._send)([
+            events.status_event(self.transaction.id, 'processing'),
+            events.status_event(self.transaction.id, 'succeeded', processed_at=timezone.now()),
+        ])
+        body = b''.join([chunk async for chunk in stream])
+
+        self.assertEqual(body.count(b'event: status'), 2)
+        self.assertIn(b'"status":"succeeded"', body)
+
+    async def test_streams_share_one_subscription(self):
+        """Test concurrent streams are fanned out from one Redis subscriber"""
+        from asgiref.sync import sync_to_async
+        from payment_api.redis_client import get_redis
+        from payments import events
+        channel = events.status_channel(self.transaction.id)
+
+        streams = []
+        for _ in range(3):
+            response = await self.async_client.get(self.url, headers=self.headers)
+            streams.append(aiter(response.streaming_content))
+            await anext(streams[-1])
+
+        self.assertEqual(await sync_to_async(get_redis().pubsub_numsub)(channel), [(channel.encode(), 1)])
+
+        await sync_to_async(events._send)([
+            events.status_event(self.transaction.id, 'failed', failure_reason='Declined'),
+        ])
+        for stream in streams:
+            body = b''.join([chunk async for chunk in stream])
+            self.assertIn(b'"status":"failed"', body)
+
+        self.assertEqual(await sync_to_async(get_redis().pubsub_numsub)(channel), [(channel.encode(), 0)])
+
+    async def test_requires_token(self):
+        """Test unauthenticated requests are rejected"""
+        response = await self.async_client.get(self.url)
+
+        self.assertEqual(response.status_code, 401)
+
+    async def test_other_merchant_transaction_not_found(self):
+        """Test merchants cannot subscribe to other merchants' transactions"""
+        other = await Merchant.objects.acreate(email='other@example.com')
+        token = await Token.objects.acreate(user=other)
+
+        response = await self.async_client.get(
+            self.url, headers={'Authorization': f'Token {token.key}'}
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_settlement_publishes_after_commit(self):
+        """Test settling a transaction publishes its final status on commit"""
+        from payments.tasks import _save_settlement
+        Transaction.objects.filter(id=self.transaction.id).update(status='processing')
+        self.transaction.status = 'succeeded'
+        self.transaction.processed_at = timezone.now()
+
+        with patch('payments.events._send') as send:
+            with self.captureOnCommitCallbacks(execute=True):
+                _save_settlement([self.transaction])
+                send.assert_not_called()
+
+        (published,), _ = send.call_args
+        self.assertEqual(published[0]['id'], str(self.transaction.id))
+        self.assertEqual(published[0]['status'], 'succeeded')
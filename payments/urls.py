@@ -9,12 +9,20 @@ urlpatterns = [
 
     # Transactions
     path('pay/', views.create_transaction, name='create-transaction'),
+    path('bulk/', views.bulk_create_transactions, name='bulk-create-transactions'),
+    path('summary/', views.transaction_summary, name='transaction-summary'),
+    path('analytics/', views.transaction_analytics, name='transaction-analytics'),
+    path('search/', views.search_transactions, name='search-transactions'),
+    path('export/', views.export_transactions, name='export-transactions'),
     path('', views.list_transactions, name='list-transactions'),
     path('<uuid:transaction_id>/', views.get_transaction, name='get-transaction'),
+    path('<uuid:transaction_id>/events/', views.transaction_events, name='transaction-events'),
 ]
 
 # Refund URLs
 refund_urlpatterns = [
     path('', views.create_refund, name='create-refund'),
+    path('bulk/', views.bulk_create_refunds, name='bulk-create-refunds'),
+    path('list/', views.list_refunds, name='list-refunds'),
     path('<uuid:refund_id>/', views.get_refund, name='get-refund'),
 ]
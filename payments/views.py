@@ -1,14 +1,40 @@
+import asyncio
+import logging
+import orjson
+import redis
+from asgiref.sync import sync_to_async
 from rest_framework import status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db import DEFAULT_DB_ALIAS, transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+from payment_api.conditional import etag_matches, make_etag, not_modified, with_etag
+from payment_api.db_router import use_replica
+from payment_api.idempotency import idempotent
 from payment_api.utils import api_response, generate_payment_key
-from .models import Transaction, Refund
+from webhooks.tasks import send_refund_webhook_notification
+from .models import MerchantSummary, Transaction, Refund
 from .serializers import (
-    TransactionSerializer, TransactionCreateSerializer,
-    RefundSerializer, PaymentKeySerializer
+    TransactionSerializer, TransactionFastSerializer, TransactionCreateSerializer,
+    BulkTransactionCreateSerializer, TransactionExportSerializer, TransactionSearchSerializer,
+    RefundSerializer, RefundFastSerializer, BulkRefundCreateSerializer, PaymentKeySerializer, MerchantSummarySerializer,
+    AnalyticsQuerySerializer, TransactionRollupSerializer
 )
-from .tasks import process_transaction
+from .tasks import process_refund, process_transaction
+from .cache import (
+    get_cached, invalidate, is_cacheable, refund_cache_key, set_cached, transaction_cache_key
+)
+from .exports import aiter_chunks, iter_csv, iter_ndjson
+from . import events, outbox
+
+logger = logging.getLogger(__name__)
 
 
 class TransactionPagination(PageNumberPagination):
@@ -17,6 +43,38 @@ class TransactionPagination(PageNumberPagination):
     max_page_size = 100
 
 
+class RefundPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class TransactionCursorPagination(CursorPagination):
+    """Keyset pagination over (merchant, -created_at, -id) without COUNT or OFFSET scans"""
+
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+
+def _get_transaction_paginator(request):
+    """Use cursor pagination when requested with ?pagination=cursor or a cursor"""
+    if request.query_params.get('pagination') == 'cursor' or 'cursor' in request.query_params:
+        return TransactionCursorPagination()
+    return TransactionPagination()
+
+
+def transaction_etag(transaction_id, updated_at):
+    """ETag of a transaction representation; refunds bump updated_at too"""
+    return make_etag('transaction', transaction_id, updated_at.isoformat())
+
+
+def refund_etag(refund_id, updated_at):
+    """ETag of a refund representation"""
+    return make_etag('refund', refund_id, updated_at.isoformat())
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def generate_payment_key_view(request):
@@ -31,6 +89,7 @@ def generate_payment_key_view(request):
     )
 
 
+@idempotent
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def create_transaction(request):
@@ -38,10 +97,14 @@ def create_transaction(request):
     serializer = TransactionCreateSerializer(data=request.data)
 
     if serializer.is_valid():
-        transaction = serializer.save(merchant=request.user)
+        with db_transaction.atomic():
+            transaction = serializer.save(merchant=request.user)
 
-        # Process transaction asynchronously
-        process_transaction.delay(str(transaction.id))
+            # Process transaction asynchronously through the outbox; in batch
+            # and async modes the batch processor or asyncio engine picks up
+            # pending rows instead
+            if settings.TRANSACTION_PROCESSING_MODE in ('blocking', 'deferred'):
+                outbox.enqueue(process_transaction, str(transaction.id))
 
         response_serializer = TransactionSerializer(transaction)
         return api_response(
@@ -57,39 +120,253 @@ def create_transaction(request):
     )
 
 
+@idempotent
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_create_transactions(request):
+    """Create a batch of transactions with a single INSERT"""
+    serializer = BulkTransactionCreateSerializer(data=request.data)
+
+    if not serializer.is_valid():
+        return api_response(
+            success=False,
+            error=serializer.errors,
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+
+    valid, errors = serializer.validate_items()
+    if not valid:
+        return api_response(
+            success=False,
+            error={'transactions': errors},
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+
+    with db_transaction.atomic():
+        transactions = Transaction.objects.bulk_create([
+            Transaction(merchant=request.user, payment_key=generate_payment_key(), **data)
+            for _, data in valid
+        ])
+
+        # One outbox INSERT for the whole batch; the relay publishes it in bulk
+        if settings.TRANSACTION_PROCESSING_MODE in ('blocking', 'deferred'):
+            outbox.enqueue_many(process_transaction, [
+                (str(transaction.id),) for transaction in transactions
+            ])
+
+    results = [
+        {'index': index, 'success': False, 'error': error}
+        for index, error in errors.items()
+    ]
+    created = TransactionSerializer(transactions, many=True).data
+    results.extend(
+        {'index': index, 'success': True, 'data': data}
+        for (index, _), data in zip(valid, created)
+    )
+    results.sort(key=lambda result: result['index'])
+
+    return api_response(
+        success=True,
+        data={
+            'created': len(transactions),
+            'failed': len(errors),
+            'results': results
+        },
+        status_code=status.HTTP_201_CREATED
+    )
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@use_replica
 def list_transactions(request):
     """List all transactions for the authenticated merchant"""
-    transactions = Transaction.objects.filter(merchant=request.user)
+    transactions = request.user.transactions.all()
 
-    # Apply pagination
-    paginator = TransactionPagination()
-    result_page = paginator.paginate_queryset(transactions, request)
-    serializer = TransactionSerializer(result_page, many=True)
+    # Apply pagination over plain rows and serialize them on the fast path
+    paginator = _get_transaction_paginator(request)
+    result_page = paginator.paginate_queryset(TransactionFastSerializer.values(transactions), request)
 
     return paginator.get_paginated_response({
         'success': True,
-        'data': serializer.data,
+        'data': TransactionFastSerializer.serialize(result_page),
         'error': None
     })
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@use_replica
+def search_transactions(request):
+    """Search the merchant's transactions by description substring or payment_key prefix"""
+    serializer = TransactionSearchSerializer(data=request.query_params)
+
+    if not serializer.is_valid():
+        return api_response(
+            success=False,
+            error=serializer.errors,
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+
+    query = serializer.validated_data['q']
+    limit = serializer.validated_data.get('limit', settings.TRANSACTION_SEARCH_MAX_RESULTS)
+
+    # icontains compiles to UPPER(description) LIKE UPPER(%q%), served by the
+    # (merchant, UPPER(description)) trigram index; the prefix match by the
+    # (merchant, payment_key) pattern index, combined with a BitmapOr
+    transactions = request.user.transactions.filter(
+        Q(description__icontains=query) | Q(payment_key__startswith=query)
+    ).order_by('-created_at', '-id')[:limit]
+
+    return api_response(
+        success=True,
+        data=TransactionFastSerializer.serialize(TransactionFastSerializer.values(transactions))
+    )
+
+
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@use_replica
+def export_transactions(request):
+    """Stream all transactions for the authenticated merchant as NDJSON or CSV"""
+    serializer = TransactionExportSerializer(data=request.query_params)
+
+    if not serializer.is_valid():
+        return api_response(
+            success=False,
+            error=serializer.errors,
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+
+    params = serializer.validated_data
+    transactions = request.user.transactions.all()
+    if 'status' in params:
+        transactions = transactions.filter(status=params['status'])
+    if 'created_after' in params:
+        transactions = transactions.filter(created_at__gte=params['created_after'])
+    if 'created_before' in params:
+        transactions = transactions.filter(created_at__lt=params['created_before'])
+
+    # A server-side cursor keeps memory flat however many rows are exported. The
+    # rows are read while streaming, after the view returns, so bind the database now
+    rows = TransactionFastSerializer.values(
+        transactions.order_by('created_at', 'id').using(transactions.db)
+    ).iterator(chunk_size=settings.TRANSACTION_EXPORT_CHUNK_SIZE)
+    representations = map(TransactionFastSerializer.to_representation, rows)
+
+    output = params['output']
+    if output == 'csv':
+        fieldnames = [name for name, _, _ in TransactionFastSerializer.fields]
+        content = iter_csv(representations, fieldnames)
+    else:
+        content = iter_ndjson(representations)
+
+    # The ASGI handler buffers synchronous iterators, the WSGI one asynchronous ones
+    if isinstance(request._request, ASGIRequest):
+        content = aiter_chunks(content, settings.TRANSACTION_EXPORT_CHUNK_SIZE)
+
+    response = StreamingHttpResponse(content, content_type=EXPORT_CONTENT_TYPES[output])
+    response['Content-Disposition'] = f'attachment; filename="transactions.{output}"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@use_replica
+def transaction_summary(request):
+    """Get settled transaction and refund totals by status and currency"""
+    buckets = MerchantSummary.objects.filter(merchant=request.user)
+    serializer = MerchantSummarySerializer(buckets, many=True)
+
+    data = {'transactions': [], 'refunds': []}
+    for bucket, item in zip(buckets, serializer.data):
+        data[f'{bucket.kind}s'].append(item)
+
+    return api_response(
+        success=True,
+        data=data
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@use_replica
+def transaction_analytics(request):
+    """Get hourly or daily rollups of transaction and refund activity"""
+    serializer = AnalyticsQuerySerializer(data=request.query_params)
+
+    if not serializer.is_valid():
+        return api_response(
+            success=False,
+            error=serializer.errors,
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+
+    params = serializer.validated_data
+    rollups = request.user.rollups.filter(
+        granularity=params['granularity'],
+        bucket_start__gte=params['start'],
+        bucket_start__lt=params['end']
+    )
+    if 'currency' in params:
+        rollups = rollups.filter(currency=params['currency'])
+
+    return api_response(
+        success=True,
+        data={
+            'granularity': params['granularity'],
+            'start': params['start'],
+            'end': params['end'],
+            'buckets': TransactionRollupSerializer(rollups, many=True).data
+        }
+    )
+
+
+def _cached_response(request, cached):
+    """Answer a detail request from a cached ``{'etag', 'data'}`` entry"""
+    if etag_matches(request, cached['etag']):
+        return not_modified(cached['etag'])
+    return with_etag(api_response(success=True, data=cached['data']), cached['etag'])
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@use_replica
 def get_transaction(request, transaction_id):
     """Get a specific transaction"""
+    # Settled transactions are served from the cache without touching the database
+    cache_key = transaction_cache_key(request.user.id, transaction_id)
+    cached = get_cached(cache_key)
+    if cached is not None:
+        return _cached_response(request, cached)
+
+    transactions = request.user.transactions.filter(id=transaction_id)
+
     try:
-        transaction = Transaction.objects.get(
-            id=transaction_id,
-            merchant=request.user
-        )
+        # Pollers revalidating with If-None-Match only cost a narrow version query
+        if 'If-None-Match' in request.headers:
+            updated_at = transactions.values_list('updated_at', flat=True).get()
+            etag = transaction_etag(transaction_id, updated_at)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+        transaction = transactions.get()
         serializer = TransactionSerializer(transaction)
+        etag = transaction_etag(transaction.id, transaction.updated_at)
+        if is_cacheable(Transaction, transaction.status, transaction._state.db):
+            set_cached(cache_key, etag, serializer.data)
 
-        return api_response(
+        response = api_response(
             success=True,
             data=serializer.data
         )
+        return with_etag(response, etag)
 
     except Transaction.DoesNotExist:
         return api_response(
@@ -99,6 +376,104 @@ def get_transaction(request, transaction_id):
         )
 
 
+def _event_error(error, status_code):
+    """Standard error envelope for the plain async events view"""
+    return JsonResponse({'success': False, 'data': None, 'error': error}, status=status_code)
+
+
+def _sse(event, data):
+    """Frame one Server-Sent Event"""
+    return b'event: ' + event + b'\ndata: ' + data + b'\n\n'
+
+
+async def _status_stream(listener, queue, snapshot):
+    """
+    Yield the current status, then every published change until a final status
+
+    The stream ends after TRANSACTION_EVENTS_TIMEOUT_SECONDS; EventSource
+    clients reconnect on their own and receive the then-current status first.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.TRANSACTION_EVENTS_TIMEOUT_SECONDS
+    current = snapshot['status']
+
+    try:
+        yield b'retry: 1000\n' + _sse(b'status', events.encode(snapshot))
+
+        while Transaction.TRANSITIONS[current] and (remaining := deadline - loop.time()) > 0:
+            try:
+                async with asyncio.timeout(min(settings.TRANSACTION_EVENTS_KEEPALIVE_SECONDS, remaining)):
+                    data = await queue.get()
+            except TimeoutError:
+                # Keeps proxies from closing an idle connection
+                yield b': keep-alive\n\n'
+                continue
+
+            if data is None:
+                logger.warning(f"Status stream of transaction {snapshot['id']} lost Redis")
+                break
+            current = orjson.loads(data)['status']
+            yield _sse(b'status', data)
+
+    finally:
+        await listener.unsubscribe(snapshot['id'], queue)
+
+
+async def transaction_events(request, transaction_id):
+    """
+    Stream status changes of a transaction as Server-Sent Events
+
+    A plain async view rather than a DRF one: under ASGI an open stream is a
+    suspended coroutine waiting on the shared Redis subscription, not a
+    worker thread. The current status is sent first, then each change
+    published by the processing tasks, and the stream closes once the
+    status is final.
+    """
+    if request.method != 'GET':
+        return _event_error('Method not allowed', status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    try:
+        authenticated = await sync_to_async(TokenAuthentication().authenticate)(request)
+    except AuthenticationFailed as exc:
+        authenticated = None
+        logger.warning(f"Rejected transaction events request: {exc}")
+    if authenticated is None:
+        response = _event_error(
+            'Authentication credentials were not provided.', status.HTTP_401_UNAUTHORIZED
+        )
+        response['WWW-Authenticate'] = 'Token'
+        return response
+    merchant = authenticated[0]
+
+    listener = events.get_status_listener()
+    try:
+        # Subscribe before reading the row so no change can slip in between
+        queue = await listener.subscribe(transaction_id)
+    except redis.RedisError as exc:
+        logger.warning(f"Cannot stream events of transaction {transaction_id}: {exc}")
+        return _event_error('Event stream unavailable', status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    # Read from the primary: a lagging replica could miss a change that was
+    # already published
+    snapshot = await Transaction.objects.using(DEFAULT_DB_ALIAS).filter(
+        merchant=merchant, id=transaction_id
+    ).values('id', 'status', 'failure_reason', 'processed_at').afirst()
+
+    if snapshot is None:
+        await listener.unsubscribe(transaction_id, queue)
+        return _event_error('Transaction not found', status.HTTP_404_NOT_FOUND)
+
+    snapshot['id'] = str(snapshot['id'])
+    response = StreamingHttpResponse(
+        _status_stream(listener, queue, snapshot),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@idempotent
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def create_refund(request):
@@ -115,12 +490,26 @@ def create_refund(request):
                 status_code=status.HTTP_404_NOT_FOUND
             )
 
-        refund = serializer.save()
-        # Mark refund as succeeded immediately (simplified)
-        from django.utils import timezone
-        refund.status = 'succeeded'
-        refund.processed_at = timezone.now()
-        refund.save()
+        amount = serializer.validated_data['amount']
+        with db_transaction.atomic():
+            # Conditional UPDATE on the transaction row: concurrent refunds
+            # serialize on its lock and can never exceed the amount
+            if not Transaction.objects.filter(id=transaction.id).reserve_refund(amount):
+                transaction.refresh_from_db(fields=['status', 'refunded_amount'])
+                return api_response(
+                    success=False,
+                    error={'amount': [
+                        f'Refund amount cannot exceed refundable amount ({transaction.refundable_amount})'
+                    ]},
+                    status_code=status.HTTP_400_BAD_REQUEST
+                )
+            refund = serializer.save()
+            # The refund changes the cached transaction's refunded_amount
+            invalidate(transaction_cache_key(request.user.id, transaction.id))
+            # Settlement happens in the worker pipeline; both jobs are
+            # published by the outbox relay once this commits
+            outbox.enqueue(process_refund, str(refund.id))
+            outbox.enqueue(send_refund_webhook_notification, str(refund.id), 'refund.created')
 
         response_serializer = RefundSerializer(refund)
         return api_response(
@@ -136,21 +525,158 @@ def create_refund(request):
     )
 
 
+def _bulk_refund_error(transaction, amount):
+    """Reason a bulk refund item cannot be applied to its locked transaction, or None"""
+    if transaction is None:
+        return {'transaction': ['Transaction not found']}
+    if transaction.status != 'succeeded':
+        return {'transaction': ['Can only refund succeeded transactions']}
+    if amount > transaction.refundable_amount:
+        return {'amount': [
+            f'Refund amount cannot exceed refundable amount ({transaction.refundable_amount})'
+        ]}
+    return None
+
+
+@idempotent
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_create_refunds(request):
+    """
+    Create a batch of refunds with set-based queries
+
+    The targeted transactions are read and locked with one ``SELECT ... FOR
+    UPDATE`` in id order, so concurrent batches and single refunds cannot
+    over-refund them. Items are applied to the locked totals in request
+    order; the new totals are written with one ``UPDATE ... FROM (VALUES
+    ...)`` and the refunds with one ``bulk_create``. Like the transaction
+    batch endpoint it answers 201 once the batch was processed, with a
+    result per item.
+    """
+    serializer = BulkRefundCreateSerializer(data=request.data)
+
+    if not serializer.is_valid():
+        return api_response(
+            success=False,
+            error=serializer.errors,
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+
+    valid, errors = serializer.validate_items()
+    if not valid:
+        return api_response(
+            success=False,
+            error={'refunds': errors},
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+
+    refunds, accepted = [], []
+    with db_transaction.atomic():
+        transactions = {
+            transaction.id: transaction
+            for transaction in Transaction.objects.select_for_update().filter(
+                merchant=request.user,
+                id__in={data['transaction'] for _, data in valid}
+            ).order_by('id')
+        }
+
+        updated_at = timezone.now()
+        touched = {}
+        for index, data in valid:
+            transaction = transactions.get(data['transaction'])
+            error = _bulk_refund_error(transaction, data['amount'])
+            if error is not None:
+                errors[index] = error
+                continue
+
+            transaction.refunded_amount += data['amount']
+            touched[transaction.id] = transaction
+            accepted.append(index)
+            refunds.append(Refund(transaction=transaction, amount=data['amount'], reason=data['reason']))
+
+        if refunds:
+            Transaction.objects.set_refunded_amounts({
+                transaction_id: transaction.refunded_amount for transaction_id, transaction in touched.items()
+            }, updated_at)
+            Refund.objects.bulk_create(refunds)
+            outbox.enqueue_many(process_refund, [(str(refund.id),) for refund in refunds])
+            outbox.enqueue_many(send_refund_webhook_notification, [
+                (str(refund.id), 'refund.created') for refund in refunds
+            ])
+            invalidate(*(
+                transaction_cache_key(request.user.id, transaction_id) for transaction_id in touched
+            ))
+
+    results = [
+        {'index': index, 'success': False, 'error': error}
+        for index, error in errors.items()
+    ]
+    created = RefundSerializer(refunds, many=True).data
+    results.extend(
+        {'index': index, 'success': True, 'data': data}
+        for index, data in zip(accepted, created)
+    )
+    results.sort(key=lambda result: result['index'])
+
+    return api_response(
+        success=True,
+        data={
+            'created': len(refunds),
+            'failed': len(errors),
+            'results': results
+        },
+        status_code=status.HTTP_201_CREATED
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@use_replica
+def list_refunds(request):
+    """List all refunds for the authenticated merchant"""
+    refunds = Refund.objects.filter(transaction__merchant=request.user).order_by('-created_at', '-id')
+
+    paginator = RefundPagination()
+    result_page = paginator.paginate_queryset(RefundFastSerializer.values(refunds), request)
+
+    return paginator.get_paginated_response({
+        'success': True,
+        'data': RefundFastSerializer.serialize(result_page),
+        'error': None
+    })
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@use_replica
 def get_refund(request, refund_id):
     """Get a specific refund"""
+    cache_key = refund_cache_key(request.user.id, refund_id)
+    cached = get_cached(cache_key)
+    if cached is not None:
+        return _cached_response(request, cached)
+
+    refunds = Refund.objects.filter(id=refund_id, transaction__merchant=request.user)
+
     try:
-        refund = Refund.objects.select_related('transaction').get(
-            id=refund_id,
-            transaction__merchant=request.user
-        )
-        serializer = RefundSerializer(refund)
+        if 'If-None-Match' in request.headers:
+            updated_at = refunds.values_list('updated_at', flat=True).get()
+            etag = refund_etag(refund_id, updated_at)
+            if etag_matches(request, etag):
+                return not_modified(etag)
 
-        return api_response(
+        # One joined row serialized on the fast path, no model instances
+        row = RefundFastSerializer.values(refunds).get()
+        data = RefundFastSerializer.to_representation(row)
+        etag = refund_etag(row['id'], row['updated_at'])
+        if is_cacheable(Refund, row['status'], refunds.db):
+            set_cached(cache_key, etag, data)
+
+        response = api_response(
             success=True,
-            data=serializer.data
+            data=data
         )
+        return with_etag(response, etag)
 
     except Refund.DoesNotExist:
         return api_response(
@@ -0,0 +1,41 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from payment_api.partitioning import convert_to_partitioned
+
+# The partition maintenance task keeps this many months ready from then on
+MONTHS_AHEAD = 3
+
+
+def partition_webhook_logs(apps, schema_editor):
+    """Rebuild webhook_logs as a monthly range-partitioned table"""
+    convert_to_partitioned(schema_editor, 'webhook_logs', MONTHS_AHEAD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0008_partition_transactions'),
+        ('webhooks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(partition_webhook_logs),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='webhooklog',
+                    name='transaction',
+                    field=models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='webhook_logs',
+                        to='payments.transaction'
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-17 05:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0013_refund_processing_state"),
+        ("webhooks", "0002_partition_webhook_logs"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="webhooklog",
+            index=models.Index(
+                fields=["webhook", "-created_at"], name="webhook_logs_listing_idx"
+            ),
+        ),
+    ]
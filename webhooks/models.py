@@ -53,12 +53,14 @@ class WebhookLog(models.Model):
         on_delete=models.CASCADE,
         related_name='logs'
     )
+    # No database constraint: foreign keys cannot target the partitioned transactions table
     transaction = models.ForeignKey(
         'payments.Transaction',
         on_delete=models.CASCADE,
         related_name='webhook_logs',
         null=True,
-        blank=True
+        blank=True,
+        db_constraint=False
     )
     event_type = models.CharField(max_length=50, choices=EVENT_TYPE_CHOICES)
     payload = models.JSONField()
@@ -74,8 +76,11 @@ class WebhookLog(models.Model):
         verbose_name = 'Webhook Log'
         verbose_name_plural = 'Webhook Logs'
         ordering = ['-created_at']
+        # Range-partitioned by month on created_at (see migration 0002)
         indexes = [
             models.Index(fields=['webhook', 'status']),
+            # Serves the newest-first delivery log listing
+            models.Index(fields=['webhook', '-created_at'], name='webhook_logs_listing_idx'),
             models.Index(fields=['transaction', 'event_type']),
         ]
 
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from payment_api.fast_serializers import ValuesSerializer, as_datetime, as_string
 from .models import Webhook, WebhookLog
 
 
@@ -37,3 +38,21 @@ class WebhookLogSerializer(serializers.ModelSerializer):
             'response_status', 'response_body', 'created_at'
         ]
         read_only_fields = fields
+
+
+class WebhookLogFastSerializer(ValuesSerializer):
+    """Read-only fast path producing the same output as WebhookLogSerializer"""
+
+    fields = (
+        ('id', 'id', as_string),
+        ('webhook_url', 'webhook__url', None),
+        ('transaction_payment_key', 'transaction__payment_key', None),
+        ('event_type', 'event_type', None),
+        ('payload', 'payload', None),
+        ('status', 'status', None),
+        ('retry_count', 'retry_count', None),
+        ('last_attempt_at', 'last_attempt_at', as_datetime),
+        ('response_status', 'response_status', None),
+        ('response_body', 'response_body', None),
+        ('created_at', 'created_at', as_datetime),
+    )
@@ -4,11 +4,48 @@ from celery import shared_task
 from django.conf import settings
 from django.utils import timezone
 from .models import Webhook, WebhookLog
-from payments.models import Transaction
+from payments.models import Refund, Transaction
 
 logger = logging.getLogger(__name__)
 
 
+def _notify(merchant, transaction, event_type, data):
+    """
+    Deliver one event to every active webhook of the merchant
+
+    Args:
+        merchant (Merchant): Merchant owning the webhooks
+        transaction (Transaction): Transaction the delivery logs refer to
+        event_type (str): Type of event
+        data (dict): Event data
+
+    Returns:
+        dict: Notification result
+    """
+    webhooks = Webhook.objects.filter(
+        merchant=merchant,
+        is_active=True
+    )
+
+    if not webhooks.exists():
+        logger.info(f"No active webhooks for merchant {merchant.email}")
+        return {'status': 'no_webhooks'}
+
+    payload = {
+        'event': event_type,
+        'timestamp': timezone.now().isoformat(),
+        'data': data
+    }
+
+    # Send to each webhook
+    results = []
+    for webhook in webhooks:
+        result = _send_single_webhook(webhook, transaction, event_type, payload)
+        results.append(result)
+
+    return {'status': 'sent', 'results': results}
+
+
 @shared_task(bind=True, max_retries=settings.WEBHOOK_MAX_RETRIES)
 def send_webhook_notification(self, transaction_id, event_type):
     """
@@ -25,39 +62,16 @@ def send_webhook_notification(self, transaction_id, event_type):
         # Get transaction
         transaction = Transaction.objects.select_related('merchant').get(id=transaction_id)
 
-        # Get active webhooks for the merchant
-        webhooks = Webhook.objects.filter(
-            merchant=transaction.merchant,
-            is_active=True
-        )
-
-        if not webhooks.exists():
-            logger.info(f"No active webhooks for merchant {transaction.merchant.email}")
-            return {'status': 'no_webhooks'}
-
-        # Prepare payload
-        payload = {
-            'event': event_type,
-            'timestamp': timezone.now().isoformat(),
-            'data': {
-                'transaction_id': str(transaction.id),
-                'payment_key': transaction.payment_key,
-                'amount': str(transaction.amount),
-                'currency': transaction.currency,
-                'status': transaction.status,
-                'merchant_id': str(transaction.merchant.id),
-                'created_at': transaction.created_at.isoformat(),
-                'processed_at': transaction.processed_at.isoformat() if transaction.processed_at else None,
-            }
-        }
-
-        # Send to each webhook
-        results = []
-        for webhook in webhooks:
-            result = _send_single_webhook(webhook, transaction, event_type, payload)
-            results.append(result)
-
-        return {'status': 'sent', 'results': results}
+        return _notify(transaction.merchant, transaction, event_type, {
+            'transaction_id': str(transaction.id),
+            'payment_key': transaction.payment_key,
+            'amount': str(transaction.amount),
+            'currency': transaction.currency,
+            'status': transaction.status,
+            'merchant_id': str(transaction.merchant.id),
+            'created_at': transaction.created_at.isoformat(),
+            'processed_at': transaction.processed_at.isoformat() if transaction.processed_at else None,
+        })
 
     except Transaction.DoesNotExist:
         logger.error(f"Transaction {transaction_id} not found")
@@ -68,6 +82,44 @@ def send_webhook_notification(self, transaction_id, event_type):
         raise
 
 
+@shared_task(bind=True, max_retries=settings.WEBHOOK_MAX_RETRIES)
+def send_refund_webhook_notification(self, refund_id, event_type):
+    """
+    Send webhook notification for refund event
+
+    Args:
+        refund_id (str): UUID of the refund
+        event_type (str): Type of event (e.g., 'refund.succeeded')
+
+    Returns:
+        dict: Notification result
+    """
+    try:
+        refund = Refund.objects.select_related('transaction__merchant').get(id=refund_id)
+        transaction = refund.transaction
+
+        return _notify(transaction.merchant, transaction, event_type, {
+            'refund_id': str(refund.id),
+            'transaction_id': str(transaction.id),
+            'payment_key': transaction.payment_key,
+            'amount': str(refund.amount),
+            'currency': transaction.currency,
+            'status': refund.status,
+            'failure_reason': refund.failure_reason,
+            'merchant_id': str(transaction.merchant.id),
+            'created_at': refund.created_at.isoformat(),
+            'processed_at': refund.processed_at.isoformat() if refund.processed_at else None,
+        })
+
+    except Refund.DoesNotExist:
+        logger.error(f"Refund {refund_id} not found")
+        return {'status': 'error', 'message': 'Refund not found'}
+
+    except Exception as exc:
+        logger.error(f"Error sending refund webhook notification: {str(exc)}")
+        raise
+
+
 def _send_single_webhook(webhook, transaction, event_type, payload):
     """
     Send webhook to a single URL with retry logic
@@ -1,10 +1,11 @@
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from authentication.models import Merchant
-from payments.models import Transaction
+from payments.models import Refund, Transaction
 from webhooks.models import Webhook, WebhookLog
 from decimal import Decimal
 from unittest.mock import patch, Mock
@@ -169,6 +170,31 @@ class WebhookAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertFalse(response.data['success'])
 
+    def test_webhook_logs(self):
+        """Test merchants list and fetch only their own delivery logs"""
+        webhook = Webhook.objects.create(merchant=self.merchant, url='https://example.com/webhook')
+        other_merchant = Merchant.objects.create_user(email='other@example.com', password='pass123')
+        other_webhook = Webhook.objects.create(merchant=other_merchant, url='https://example.com/webhook')
+        log = WebhookLog.objects.create(
+            webhook=webhook, event_type='refund.created', payload={'event': 'refund.created'}
+        )
+        other_log = WebhookLog.objects.create(webhook=other_webhook, event_type='refund.created', payload={})
+
+        response = self.client.get(reverse('webhooks:list-webhook-logs'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results']['data'][0]['id'], str(log.id))
+
+        response = self.client.get(reverse('webhooks:get-webhook-log', kwargs={'log_id': log.id}))
+
+        self.assertEqual(response.data['data']['webhook_url'], 'https://example.com/webhook')
+        self.assertEqual(response.data['data']['payload'], {'event': 'refund.created'})
+
+        response = self.client.get(reverse('webhooks:get-webhook-log', kwargs={'log_id': other_log.id}))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
 
 class WebhookNotificationTest(TestCase):
     """Test cases for webhook notification sending"""
@@ -238,6 +264,28 @@ class WebhookNotificationTest(TestCase):
         log = logs.first()
         self.assertEqual(log.status, 'failed')
 
+    @patch('webhooks.tasks.requests.post')
+    def test_refund_webhook_notification(self, mock_post):
+        """Test refund events are delivered with the refund payload"""
+        mock_post.return_value = Mock(status_code=200, text='OK')
+        refund = Refund.objects.create(
+            transaction=self.transaction,
+            amount=Decimal('25.00'),
+            reason='Customer request'
+        )
+
+        from webhooks.tasks import send_refund_webhook_notification
+        send_refund_webhook_notification(str(refund.id), 'refund.created')
+
+        payload = mock_post.call_args.kwargs['json']
+        self.assertEqual(payload['event'], 'refund.created')
+        self.assertEqual(payload['data']['refund_id'], str(refund.id))
+        self.assertEqual(payload['data']['amount'], '25.00')
+        self.assertEqual(payload['data']['status'], 'pending')
+        log = WebhookLog.objects.get(webhook=self.webhook)
+        self.assertEqual(log.event_type, 'refund.created')
+        self.assertEqual(log.transaction_id, self.transaction.id)
+
     def test_inactive_webhook_not_triggered(self):
         """Test that inactive webhooks are not triggered"""
         self.webhook.is_active = False
@@ -252,3 +300,51 @@ class WebhookNotificationTest(TestCase):
             transaction=self.transaction
         )
         self.assertFalse(logs.exists())
+
+
+class WebhookLogFastSerializerTest(TestCase):
+    """Test cases for the fast webhook log serializer"""
+
+    def setUp(self):
+        self.merchant = Merchant.objects.create_user(
+            email='merchant@example.com',
+            password='pass123'
+        )
+        self.webhook = Webhook.objects.create(
+            merchant=self.merchant,
+            url='https://example.com/webhook'
+        )
+        transaction = Transaction.objects.create(
+            merchant=self.merchant,
+            amount=Decimal('100.00'),
+            currency='USD'
+        )
+        WebhookLog.objects.create(
+            webhook=self.webhook,
+            transaction=transaction,
+            event_type='transaction.succeeded',
+            payload={'event': 'transaction.succeeded', 'data': {'amount': '100.00'}},
+            status='sent',
+            response_status=200,
+            response_body='OK',
+            last_attempt_at=timezone.now()
+        )
+        WebhookLog.objects.create(
+            webhook=self.webhook,
+            event_type='refund.created',
+            payload={}
+        )
+
+    def test_fast_serializer_matches(self):
+        """Test the fast output equals WebhookLogSerializer output"""
+        import json
+        from rest_framework.renderers import JSONRenderer
+        from webhooks.serializers import WebhookLogSerializer, WebhookLogFastSerializer
+        queryset = WebhookLog.objects.all()
+
+        expected = json.loads(JSONRenderer().render(WebhookLogSerializer(queryset, many=True).data))
+        actual = json.loads(JSONRenderer().render(
+            WebhookLogFastSerializer.serialize(WebhookLogFastSerializer.values(queryset))
+        ))
+
+        self.assertEqual(actual, expected)
@@ -6,5 +6,7 @@ app_name = 'webhooks'
 urlpatterns = [
     path('', views.create_webhook, name='create-webhook'),
     path('list/', views.list_webhooks, name='list-webhooks'),
+    path('logs/', views.list_webhook_logs, name='list-webhook-logs'),
+    path('logs/<uuid:log_id>/', views.get_webhook_log, name='get-webhook-log'),
     path('<uuid:webhook_id>/', views.delete_webhook, name='delete-webhook'),
 ]
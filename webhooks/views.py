@@ -1,9 +1,17 @@
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
+from payment_api.db_router import use_replica
 from payment_api.utils import api_response
-from .models import Webhook
-from .serializers import WebhookSerializer
+from .models import Webhook, WebhookLog
+from .serializers import WebhookSerializer, WebhookLogFastSerializer
+
+
+class WebhookLogPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
 
 
 @api_view(['POST'])
@@ -31,6 +39,7 @@ def create_webhook(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@use_replica
 def list_webhooks(request):
     """List all webhooks for the authenticated merchant"""
     webhooks = Webhook.objects.filter(merchant=request.user)
@@ -64,3 +73,42 @@ def delete_webhook(request, webhook_id):
             error='Webhook not found',
             status_code=status.HTTP_404_NOT_FOUND
         )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@use_replica
+def list_webhook_logs(request):
+    """List delivery attempts of the authenticated merchant's webhooks, newest first"""
+    logs = WebhookLog.objects.filter(webhook__merchant=request.user).order_by('-created_at', '-id')
+
+    paginator = WebhookLogPagination()
+    result_page = paginator.paginate_queryset(WebhookLogFastSerializer.values(logs), request)
+
+    return paginator.get_paginated_response({
+        'success': True,
+        'data': WebhookLogFastSerializer.serialize(result_page),
+        'error': None
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@use_replica
+def get_webhook_log(request, log_id):
+    """Get a specific webhook delivery attempt"""
+    logs = WebhookLog.objects.filter(id=log_id, webhook__merchant=request.user)
+
+    try:
+        row = WebhookLogFastSerializer.values(logs).get()
+    except WebhookLog.DoesNotExist:
+        return api_response(
+            success=False,
+            error='Webhook log not found',
+            status_code=status.HTTP_404_NOT_FOUND
+        )
+
+    return api_response(
+        success=True,
+        data=WebhookLogFastSerializer.to_representation(row)
+    )